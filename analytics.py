@@ -0,0 +1,202 @@
+"""
+Bulk price analytics over the numeric price_observations columns.
+
+A market's observations are loaded in one query into flat NumPy arrays,
+sorted by product and time, and every statistic is computed for all
+products at once: per-product change, volatility of log returns, a
+trailing rolling median and robust outlier flags.
+
+Requires numpy (pip install numpy); the rest of SayerDark runs without it.
+"""
+import warnings
+from db import get_connection
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Rows gathered at a time for the rolling windows, to bound memory
+CHUNK_ROWS = 1_000_000
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("price analytics needs numpy: pip install numpy")
+
+class PriceSeries:
+    """
+    Price observations of many products as flat arrays, sorted by
+    product and then time. Product i owns rows starts[i]:ends[i].
+    """
+
+    def __init__(self, product_ids, amounts, observed_at, products):
+        self.product_ids = product_ids
+        self.amounts = amounts
+        self.observed_at = observed_at
+        new_product = np.ones(len(product_ids), dtype=bool)
+        new_product[1:] = product_ids[1:] != product_ids[:-1]
+        self.starts = np.flatnonzero(new_product)
+        self.ends = np.r_[self.starts[1:], len(product_ids)].astype(np.int64)
+        # Product number of every observation
+        self.segment = np.cumsum(new_product) - 1
+        ids = product_ids[self.starts]
+        self.products = [products.get(int(product_id), {}) for product_id in ids]
+
+    def __len__(self):
+        return len(self.amounts)
+
+def load_series(market=None, currency=None):
+    """
+    Load every numeric price observation, optionally for one market and
+    one currency. Pass a currency when a market prices in several, so
+    returns are not computed across currencies.
+    """
+    _require_numpy()
+    conditions = ['o.price_amount IS NOT NULL']
+    params = []
+    if market is not None:
+        conditions.append('p.market = ?')
+        params.append(market)
+    if currency is not None:
+        conditions.append('o.currency = ?')
+        params.append(currency)
+    where = ' AND '.join(conditions)
+
+    conn = get_connection()
+    rows = conn.execute(f'''
+        SELECT o.product_id, o.price_amount, o.observed_at
+        FROM price_observations o
+        JOIN products p ON p.id = o.product_id
+        WHERE {where}
+        ORDER BY o.product_id, o.observed_at, o.id
+    ''', params).fetchall()
+    product_query = 'SELECT id, market, product_name, currency FROM products'
+    product_params = []
+    if market is not None:
+        product_query += ' WHERE market = ?'
+        product_params.append(market)
+    products = {
+        product_id: {'market': name_market, 'product_name': name, 'currency': product_currency}
+        for product_id, name_market, name, product_currency
+        in conn.execute(product_query, product_params)
+    }
+
+    if rows:
+        product_ids, amounts, observed_at = zip(*rows)
+    else:
+        product_ids, amounts, observed_at = (), (), ()
+    return PriceSeries(
+        np.array(product_ids, dtype=np.int64),
+        np.array(amounts, dtype=np.float64),
+        np.array(observed_at, dtype=object),
+        products
+    )
+
+def _window(series, offsets, rows):
+    """
+    Gather, for each row in `rows`, the amounts `offsets` observations
+    back within the same product; missing positions are NaN
+    """
+    index = rows[:, None] - offsets[None, :]
+    valid = index >= series.starts[series.segment[rows]][:, None]
+    values = series.amounts[np.maximum(index, 0)]
+    return np.where(valid, values, np.nan)
+
+def rolling_stats(series, window=5, threshold=3.5, min_history=3, floor=0.05):
+    """
+    Return (rolling_median, outlier) per observation.
+    rolling_median covers the last `window` observations including the
+    current one. An observation is an outlier when it is more than
+    `threshold` robust standard deviations (1.4826 * MAD) from the median
+    of the `window` observations before it, given at least `min_history`
+    of them; the scale never drops below `floor` times that median.
+    """
+    _require_numpy()
+    n = len(series)
+    rolling_median = np.full(n, np.nan)
+    outlier = np.zeros(n, dtype=bool)
+    current = np.arange(window)
+    previous = np.arange(1, window + 1)
+
+    with warnings.catch_warnings():
+        # Rows without history produce all-NaN windows, which is expected
+        warnings.simplefilter('ignore', RuntimeWarning)
+        for start in range(0, n, CHUNK_ROWS):
+            rows = np.arange(start, min(start + CHUNK_ROWS, n))
+            rolling_median[rows] = np.nanmedian(_window(series, current, rows), axis=1)
+
+            history = _window(series, previous, rows)
+            count = np.sum(~np.isnan(history), axis=1)
+            median = np.nanmedian(history, axis=1)
+            mad = np.nanmedian(np.abs(history - median[:, None]), axis=1)
+            scale = np.maximum(1.4826 * mad, floor * np.abs(median))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                z = np.abs(series.amounts[rows] - median) / scale
+            outlier[rows] = (count >= min_history) & (z > threshold)
+    return rolling_median, outlier
+
+def analyze(series, window=5, threshold=3.5, min_history=3):
+    """
+    Compute per-product statistics for a PriceSeries in one vectorized
+    pass and return them as a list of dicts
+    """
+    _require_numpy()
+    if not len(series):
+        return []
+    a = series.amounts
+    segment = series.segment
+    products = len(series.starts)
+
+    first = a[series.starts]
+    last = a[series.ends - 1]
+    change = last - first
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change_pct = np.where(first != 0, change / first * 100, np.nan)
+
+    # Consecutive observations of the same product
+    same = segment[1:] == segment[:-1]
+    moved = same & (a[1:] != a[:-1])
+    price_changes = np.bincount(segment[1:][moved], minlength=products)
+
+    # Volatility: sample standard deviation of log returns
+    valid = same & (a[:-1] > 0) & (a[1:] > 0)
+    returns = np.log(a[1:][valid] / a[:-1][valid])
+    owner = segment[1:][valid]
+    count = np.bincount(owner, minlength=products)
+    total = np.bincount(owner, weights=returns, minlength=products)
+    squares = np.bincount(owner, weights=returns * returns, minlength=products)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variance = (squares - total * total / count) / (count - 1)
+    volatility = np.where(count > 1, np.sqrt(np.maximum(variance, 0)), np.nan)
+
+    rolling_median, outlier = rolling_stats(series, window, threshold, min_history)
+    outliers = np.bincount(segment[outlier], minlength=products)
+
+    observations = series.ends - series.starts
+    report = []
+    for i, product in enumerate(series.products):
+        last_row = series.ends[i] - 1
+        report.append({
+            'market': product.get('market'),
+            'product_name': product.get('product_name'),
+            'currency': product.get('currency'),
+            'observations': int(observations[i]),
+            'first_price': float(first[i]),
+            'last_price': float(last[i]),
+            'change': float(change[i]),
+            'change_pct': _number(change_pct[i]),
+            'price_changes': int(price_changes[i]),
+            'volatility': _number(volatility[i]),
+            'rolling_median': _number(rolling_median[last_row]),
+            'outliers': int(outliers[i]),
+            'last_is_outlier': bool(outlier[last_row]),
+            'last_seen_at': series.observed_at[last_row]
+        })
+    return report
+
+def _number(value):
+    return None if np.isnan(value) else float(value)
+
+def market_report(market=None, currency=None, **options):
+    """Load and analyze a market's price history in one call"""
+    return analyze(load_series(market, currency), **options)
@@ -0,0 +1,74 @@
+"""
+Compare the per-link soup.find lookup with the single-pass anchor index
+on a synthetic page.
+
+    python benchmarks/bench_links.py --anchors 5000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from document import ParsedDocument
+from extractors import extract_anchors, extract_links
+
+BASE_URL = 'http://bench.local/category/'
+
+def build_page(count):
+    """Build a page with a mix of absolute, relative and repeated links"""
+    anchors = []
+    for i in range(count):
+        if i % 3 == 0:
+            href = f'http://bench.local/item/{i}'
+        elif i % 3 == 1:
+            href = f'/item/{i}'
+        else:
+            href = f'http://bench.local/item/{i - 2}'
+        anchors.append(f'<li><a href="{href}" rel="nofollow">Item {i}</a></li>')
+    return f"<html><body><ul>{''.join(anchors)}</ul></body></html>"
+
+def legacy_links(document, base_url):
+    """The previous structure-mode lookup: one soup.find per link"""
+    soup = document.soup
+    links = []
+    for link in extract_links(document, base_url):
+        links.append({
+            'url': link,
+            'text': soup.find('a', href=link).text.strip() if soup.find('a', href=link) else ''
+        })
+    return links
+
+def indexed_links(document, base_url):
+    return [{'url': a['url'], 'text': a['text']}
+            for a in extract_anchors(document, base_url).values()]
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--anchors', type=int, default=5000)
+    args = parser.parse_args()
+
+    document = ParsedDocument(build_page(args.anchors), BASE_URL)
+    document.soup  # parse outside the timed sections
+
+    legacy, legacy_time = timed(legacy_links, document, BASE_URL)
+    indexed, indexed_time = timed(indexed_links, document, BASE_URL)
+
+    key = lambda link: link['url']
+    if sorted(legacy, key=key) != sorted(indexed, key=key):
+        print("[!] Outputs differ")
+        sys.exit(1)
+
+    print(f"[*] {args.anchors} anchors, {len(indexed)} unique links")
+    print(f"[*] soup.find per link: {legacy_time * 1000:.1f} ms")
+    print(f"[*] anchor index:       {indexed_time * 1000:.1f} ms")
+    print(f"[+] Speedup: {legacy_time / indexed_time:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Crawl, parse and store benchmarks against a local synthetic market.
+
+    python benchmarks/run_benchmarks.py --pages 200 --listings 30 --output bench.json
+    python benchmarks/run_benchmarks.py --baseline bench.json
+    python benchmarks/run_benchmarks.py --proxies 4 --proxy-bandwidth 500000
+
+Measures pages/sec through crawl_page, ms/page in extract_products and
+parsers.market1.parse_products, upserts/sec in db.add_or_update_product
+and peak RSS, and writes the results as JSON. Everything runs against a
+temporary database; nothing leaves 127.0.0.1. With --proxies N the crawl
+goes to the market as a .onion site through N local SOCKS stand-ins.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_market import build_site, SiteServer
+from socks_standin import SocksStandin
+
+# Higher is better for these metrics; lower is better for the rest
+HIGHER_IS_BETTER = {'pages_per_sec', 'upserts_per_sec'}
+
+@contextlib.contextmanager
+def quiet():
+    """Silence stdout at the file-descriptor level, including worker processes"""
+    sys.stdout.flush()
+    saved = os.dup(1)
+    with open(os.devnull, 'w') as devnull:
+        os.dup2(devnull.fileno(), 1)
+        try:
+            yield
+        finally:
+            sys.stdout.flush()
+            os.dup2(saved, 1)
+            os.close(saved)
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    """Peak resident set size in MB (ru_maxrss is KB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def configure(workdir, args, proxies=()):
+    """Point the lazy config at a throwaway database before anything imports it"""
+    config_file = os.path.join(workdir, 'config.json')
+    settings = {}
+    if proxies:
+        settings = {
+            'TOR_SOCKS_PROXY': {'http': proxies[0].url, 'https': proxies[0].url},
+            'TOR_SOCKS_PROXIES': [proxy.url for proxy in proxies[1:]]
+        }
+    with open(config_file, 'w') as f:
+        json.dump({
+            **settings,
+            'DATABASE_FILE': os.path.join(workdir, 'bench.db'),
+            'MAX_DEPTH': args.pages,
+            'MAX_PAGES': args.pages,
+            'MAX_CONCURRENCY': args.concurrency,
+            'MAX_PER_HOST': args.concurrency,
+            'PARSE_WORKERS': args.parse_workers,
+            'REQUEST_DELAY': 0,
+            # Measure the pipeline, not the politeness limit
+            'RATE_MAX': 1e6,
+            'RATE_BURST': args.concurrency
+        }, f)
+    import config
+    config.use_config_file(config_file)
+
+def bench_crawl(base_url, proxied=False):
+    import db
+    import sayerdark
+    db.setup_db()
+    if proxied:
+        from proxy_health import ProxyHealth
+        # The stand-ins cannot reach check.torproject.org
+        sayerdark.tor_health = ProxyHealth(lambda: True)
+        base_url = base_url.replace('127.0.0.1', 'benchmarket.onion')
+    with quiet():
+        started = time.perf_counter()
+        pages = sayerdark.crawl_page(f"{base_url}/page/0", market='bench')
+        elapsed = time.perf_counter() - started
+    return {
+        'pages': pages,
+        'seconds': round(elapsed, 4),
+        'pages_per_sec': round(pages / elapsed, 2) if elapsed else None
+    }
+
+def bench_extract(site, samples):
+    from extractors import extract_products
+    from parsers import get_parser
+    market1 = get_parser('market1')
+    pages = list(site.items())[:samples]
+
+    results = {}
+    for name, func in [('extract_products', extract_products),
+                       ('market1_parse_products', market1.parse_products)]:
+        with quiet():
+            started = time.perf_counter()
+            found = 0
+            for path, html in pages:
+                found += len(func(html, f"http://bench.local{path}"))
+            elapsed = time.perf_counter() - started
+        results[name] = {
+            'pages': len(pages),
+            'products': found,
+            'ms_per_page': round(elapsed * 1000 / len(pages), 3)
+        }
+    return results
+
+def bench_db(count):
+    import db
+    db.setup_db()
+    started = time.perf_counter()
+    for i in range(count):
+        # Every other round changes the price, so history is exercised too
+        db.add_or_update_product('bench-db', f"Product {i % (count // 2 or 1)}",
+                                 f"${i}", 'http://bench.local/')
+    elapsed = time.perf_counter() - started
+    return {
+        'upserts': count,
+        'seconds': round(elapsed, 4),
+        'upserts_per_sec': round(count / elapsed, 2) if elapsed else None
+    }
+
+def flatten(results, prefix=''):
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from flatten(value, f"{name}.")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, value
+
+def compare(current, baseline):
+    """Print each metric next to its baseline value"""
+    old = dict(flatten(baseline['results']))
+    print("\n[*] Compared with baseline:")
+    for name, value in flatten(current['results']):
+        if name not in old or not old[name]:
+            continue
+        change = (value - old[name]) / old[name]
+        better = change > 0 if name.rsplit('.', 1)[-1] in HIGHER_IS_BETTER else change < 0
+        marker = '+' if better or change == 0 else '!'
+        print(f"[{marker}] {name}: {old[name]} -> {value} ({change:+.1%})")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=100)
+    parser.add_argument('--listings', type=int, default=20)
+    parser.add_argument('--nesting', type=int, default=1)
+    parser.add_argument('--fanout', type=int, default=5)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--parse-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--extract-samples', type=int, default=50)
+    parser.add_argument('--upserts', type=int, default=5000)
+    parser.add_argument('--proxies', type=int, default=0,
+                        help='crawl through this many local SOCKS stand-ins')
+    parser.add_argument('--proxy-bandwidth', type=int, default=0,
+                        help='bytes/sec each stand-in relays (0 = unlimited)')
+    parser.add_argument('--output', default=None, help='write results JSON here')
+    parser.add_argument('--baseline', default=None, help='results JSON to compare against')
+    args = parser.parse_args()
+
+    site = build_site(args.pages, args.listings, args.nesting, args.fanout)
+
+    with tempfile.TemporaryDirectory() as workdir, contextlib.ExitStack() as stack:
+        proxies = [stack.enter_context(SocksStandin(args.proxy_bandwidth))
+                   for _ in range(args.proxies)]
+        configure(workdir, args, proxies)
+        results = {}
+        with SiteServer(site) as server:
+            results['crawl'] = bench_crawl(server.url, proxied=bool(proxies))
+        if proxies:
+            from proxy_pool import default_proxy_pool
+            results['crawl']['proxies'] = default_proxy_pool.stats()
+        results['extract'] = bench_extract(site, min(args.extract_samples, args.pages))
+        results['db'] = bench_db(args.upserts)
+
+        from pipeline import default_parse_pool
+        default_parse_pool.close()
+        import db
+        db.product_writer.close()
+
+    results['memory'] = {
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'peak_rss_children_mb': round(peak_rss_mb(resource.RUSAGE_CHILDREN), 1)
+    }
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': vars(args),
+        'results': results
+    }
+    print(json.dumps(report, indent=4))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+        print(f"[+] Results saved to: {args.output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(report, json.load(f))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Local SOCKS5 stand-ins for a Tor client, for benchmarks.
+
+Each SocksStandin accepts CONNECT requests (no auth or any username and
+password, like Tor's stream isolation credentials), resolves .onion
+names to 127.0.0.1 so a synthetic market can pose as a hidden service,
+and relays the traffic. `bandwidth` caps the bytes per second relayed
+through one stand-in across all its connections, to model the shared
+capacity of a single Tor client.
+"""
+import select
+import socket
+import struct
+import threading
+import time
+from socketserver import StreamRequestHandler, ThreadingTCPServer
+
+CHUNK_SIZE = 16 * 1024
+
+class Throttle:
+    """Token bucket shared by every connection of one stand-in"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.allowance = 0.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, size):
+        if not self.rate:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.allowance = min(self.rate, self.allowance + (now - self.updated) * self.rate)
+            self.updated = now
+            self.allowance -= size
+            wait = -self.allowance / self.rate if self.allowance < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+class SocksHandler(StreamRequestHandler):
+
+    def _read(self, size):
+        data = self.rfile.read(size)
+        if len(data) != size:
+            raise ConnectionError("client closed during handshake")
+        return data
+
+    def handle(self):
+        version, count = self._read(2)
+        methods = self._read(count)
+        if 2 in methods:
+            # Username/password: accept anything, as Tor does
+            self.wfile.write(b'\x05\x02')
+            self._read(1)
+            self._read(self._read(1)[0])
+            self._read(self._read(1)[0])
+            self.wfile.write(b'\x01\x00')
+        else:
+            self.wfile.write(b'\x05\x00')
+
+        _, command, _, address_type = self._read(4)
+        if address_type == 1:
+            host = socket.inet_ntoa(self._read(4))
+        elif address_type == 3:
+            host = self._read(self._read(1)[0]).decode('idna')
+        else:
+            host = socket.inet_ntop(socket.AF_INET6, self._read(16))
+        port = struct.unpack('!H', self._read(2))[0]
+        if host.endswith('.onion'):
+            host = '127.0.0.1'
+
+        try:
+            upstream = socket.create_connection((host, port), timeout=10)
+        except OSError:
+            self.wfile.write(b'\x05\x05\x00\x01' + b'\x00' * 6)
+            return
+        self.wfile.write(b'\x05\x00\x00\x01' + b'\x00' * 6)
+        self.wfile.flush()
+        self.server.relay(self.connection, upstream)
+
+class SocksStandin(ThreadingTCPServer):
+    """A SOCKS5 proxy on 127.0.0.1 served from a background thread"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, bandwidth=0, port=0):
+        super().__init__(('127.0.0.1', port), SocksHandler)
+        self.throttle = Throttle(bandwidth)
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    def relay(self, client, upstream):
+        peers = {client: upstream, upstream: client}
+        try:
+            while True:
+                readable, _, _ = select.select(list(peers), [], [], 30)
+                if not readable:
+                    return
+                for sock in readable:
+                    data = sock.recv(CHUNK_SIZE)
+                    if not data:
+                        return
+                    if sock is upstream:
+                        self.throttle.consume(len(data))
+                    peers[sock].sendall(data)
+        except OSError:
+            pass
+        finally:
+            upstream.close()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"socks5h://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
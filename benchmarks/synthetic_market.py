@@ -0,0 +1,84 @@
+"""
+Synthetic market sites for benchmarks, served from a local HTTP server.
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def build_site(pages=100, listings=20, nesting=1, fanout=5):
+    """
+    Build {path: html} for a market with `pages` listing pages.
+    Each page holds `listings` products, each wrapped in `nesting`
+    div.item layers so the product selectors match nested containers,
+    and links to `fanout` other pages. The markup matches both the
+    generic selectors and parsers/market1.
+    """
+    site = {}
+    for page in range(pages):
+        links = ''.join(
+            f'<li><a href="/page/{(page * fanout + k) % pages}">Page {(page * fanout + k) % pages}</a></li>'
+            for k in range(1, fanout + 1)
+        )
+        products = []
+        for item in range(listings):
+            card = (
+                f'<div class="product-container">'
+                f'<h2 class="title">Listing {page}-{item}</h2>'
+                f'<img src="/img/{page}-{item}.png">'
+                f'<p class="description">Synthetic listing {item} on page {page}</p>'
+                f'<span class="price">${(page * listings + item) % 997 + 1},000</span>'
+                f'<a href="/page/{page}?utm_source=bench#item-{item}">details</a>'
+                f'</div>'
+            )
+            for _ in range(nesting):
+                card = f'<div class="item">{card}</div>'
+            products.append(card)
+        site[f'/page/{page}'] = (
+            f'<html><head><title>Market page {page}</title>'
+            f'<meta name="description" content="Synthetic market page {page}"></head>'
+            f'<body><nav><ul>{links}</ul></nav>'
+            f'<div class="container"><h2>Category {page % 10}</h2>{"".join(products)}</div>'
+            f'<a href="/cart">Cart</a></body></html>'
+        )
+    return site
+
+class SiteServer:
+    """Serve a {path: html} dict on 127.0.0.1 from a background thread"""
+
+    def __init__(self, site, port=0):
+        pages = {path: html.encode('utf-8') for path, html in site.items()}
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                body = pages.get(self.path.split('?')[0])
+                if body is None:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
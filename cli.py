@@ -0,0 +1,200 @@
+"""
+Non-interactive command line for cron and supervisor runs.
+
+    python sayerdark.py monitor --url http://example.onion --rounds 1
+    python sayerdark.py monitor --all-markets
+    python sayerdark.py map http://example.onion
+    python sayerdark.py summarize site_map_example.onion.jsonl
+    python sayerdark.py stats --json
+    python sayerdark.py export --format csv --output products.csv
+    python sayerdark.py prices --market market1 --currency BTC --outliers
+
+Only argparse is imported up front; configuration, the database and the
+crawler are loaded by the subcommand that needs them.
+"""
+import argparse
+import sys
+
+def _valid_url(url):
+    if not (url.startswith("http://") or url.startswith("https://")):
+        raise argparse.ArgumentTypeError("URL must start with http:// or https://")
+    return url
+
+def cmd_monitor(args):
+    import sayerdark
+    if args.url:
+        sayerdark.monitor_products(args.url, rounds=args.rounds,
+                                   interval=args.interval or sayerdark.CHECK_INTERVAL,
+                                   market=args.market_name)
+    else:
+        sayerdark.monitor_markets(names=args.market, rounds=args.rounds)
+    return 0
+
+def cmd_map(args):
+    import sayerdark
+    sayerdark.map_site(args.url, compress=args.gzip or sayerdark.SITEMAP_COMPRESS)
+    return 0
+
+def cmd_summarize(args):
+    from sitemap import build_summary
+    output = args.output or args.records.split('.jsonl')[0] + '.json'
+    summary = build_summary(args.records, output)
+    print(f"[+] Summary of {summary['pages']} pages saved to: {output}")
+    return 0
+
+def cmd_stats(args):
+    import json
+    from db import setup_db, list_markets, get_market_summaries
+    setup_db()
+    summaries = get_market_summaries()
+    empty = {'total_products': 0, 'active_products': 0,
+             'products_with_price_changes': 0, 'price_observations': 0}
+    stats = {name: summaries.get(name, empty) for name in args.market or list_markets()}
+
+    if args.json:
+        print(json.dumps(stats, indent=4))
+    elif not stats:
+        print("[!] No markets in the database")
+    else:
+        for name, values in stats.items():
+            print(f"[*] {name}: {values['total_products']} products, "
+                  f"{values['active_products']} active, "
+                  f"{values['products_with_price_changes']} with price changes")
+    return 0
+
+def cmd_export(args):
+    import csv
+    import json
+    from db import setup_db, iter_products
+    setup_db()
+    # last_seen is stored as UTC 'YYYY-MM-DD HH:MM:SS'
+    seen_since = None
+    if args.active:
+        from datetime import datetime, timedelta, timezone
+        seen_since = (datetime.now(timezone.utc) - timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S')
+    out = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    try:
+        rows = iter_products(args.market, seen_since)
+        if args.format == 'csv':
+            writer = None
+            for row in rows:
+                if writer is None:
+                    writer = csv.DictWriter(out, fieldnames=list(row))
+                    writer.writeheader()
+                writer.writerow(row)
+        else:
+            # JSON Lines, one product per line, so exports stream
+            for row in rows:
+                out.write(json.dumps(row, ensure_ascii=False) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    if args.output:
+        print(f"[+] Products exported to: {args.output}")
+    return 0
+
+def cmd_prices(args):
+    import json
+    from db import setup_db
+    setup_db()
+    try:
+        from analytics import market_report
+        report = market_report(args.market, args.currency, window=args.window,
+                               threshold=args.threshold)
+    except ImportError as e:
+        print(f"[!] {e}")
+        return 1
+    if args.outliers:
+        report = [row for row in report if row['outliers']]
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        for row in report:
+            out.write(json.dumps(row, ensure_ascii=False) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    if args.output:
+        print(f"[+] Price report for {len(report)} products saved to: {args.output}")
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='sayerdark',
+        description='SayerDark web market monitor'
+    )
+    parser.add_argument('--config', default=None,
+                        help='configuration file (default: config.json)')
+    parser.add_argument('--log-level', default=None,
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help='override LOG_LEVEL')
+    parser.add_argument('--log-format', default=None, choices=['text', 'json'],
+                        help='override LOG_FORMAT')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    monitor = commands.add_parser('monitor', help='monitor products and prices')
+    target = monitor.add_mutually_exclusive_group(required=True)
+    target.add_argument('--url', type=_valid_url, help='monitor a single site')
+    target.add_argument('--market', action='append',
+                        help='monitor a configured market (repeatable)')
+    target.add_argument('--all-markets', action='store_true',
+                        help='monitor every configured market')
+    monitor.add_argument('--market-name', default='target',
+                         help='market name to store --url products under')
+    monitor.add_argument('--rounds', type=int, default=0,
+                         help='stop after N rounds (default: run until interrupted)')
+    monitor.add_argument('--interval', type=int, default=None,
+                         help='seconds between rounds for --url')
+    monitor.set_defaults(func=cmd_monitor)
+
+    site_map = commands.add_parser('map', help='extract a site structure')
+    site_map.add_argument('url', type=_valid_url)
+    site_map.add_argument('--gzip', action='store_true',
+                          help='gzip the page records (.jsonl.gz)')
+    site_map.set_defaults(func=cmd_map)
+
+    summarize = commands.add_parser('summarize',
+                                    help='rebuild a site map summary from its page records')
+    summarize.add_argument('records', help='site_map_<host>.jsonl or .jsonl.gz file')
+    summarize.add_argument('--output', default=None,
+                           help='summary file (default: next to the records)')
+    summarize.set_defaults(func=cmd_summarize)
+
+    stats = commands.add_parser('stats', help='print per-market statistics')
+    stats.add_argument('--market', action='append', help='limit to a market (repeatable)')
+    stats.add_argument('--json', action='store_true', help='print JSON')
+    stats.set_defaults(func=cmd_stats)
+
+    export = commands.add_parser('export', help='export stored products')
+    export.add_argument('--market', default=None, help='limit to one market')
+    export.add_argument('--active', action='store_true',
+                        help='only products seen in the last day')
+    export.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+    export.add_argument('--output', default=None, help='output file (default: stdout)')
+    export.set_defaults(func=cmd_export)
+
+    prices = commands.add_parser('prices',
+                                 help='per-product price changes, volatility and outliers (needs numpy)')
+    prices.add_argument('--market', default=None, help='limit to one market')
+    prices.add_argument('--currency', default=None, help='limit to one currency, e.g. BTC')
+    prices.add_argument('--window', type=int, default=5,
+                        help='observations in the rolling median window')
+    prices.add_argument('--threshold', type=float, default=3.5,
+                        help='robust z-score above which a price is an outlier')
+    prices.add_argument('--outliers', action='store_true',
+                        help='only products with outlier prices')
+    prices.add_argument('--output', default=None, help='JSON Lines file (default: stdout)')
+    prices.set_defaults(func=cmd_prices)
+
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.config:
+        import config
+        config.use_config_file(args.config)
+    from logs import setup_logging
+    setup_logging(args.log_level, args.log_format)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,9 +15,61 @@ DEFAULT_CONFIG = {
     'REQUEST_DELAY': 2,
     'MAX_DEPTH': 3,
     'MAX_PAGES': 100,
+    'MAX_CONCURRENCY': 8,
+    'MAX_PER_HOST': 4,
+    'POOL_MAXSIZE': 4,
+    'POOL_IDLE_TIMEOUT': 90,
+    'PROXY_HEALTH_TTL': 300,
+    'PARSER_BACKEND': 'auto',
+    'WRITE_BATCH_SIZE': 200,
+    'WRITE_FLUSH_INTERVAL': 1,
+    'PRODUCT_NESTING': 'innermost',
+    'MAX_BODY_SIZE': 5 * 1024 * 1024,
+    'PAGE_DEADLINE': 120,
+    'ALLOWED_CONTENT_TYPES': ['text/html', 'application/xhtml+xml'],
+    'CANONICAL_DROP_PARAMS': ['utm_*', 'fbclid', 'gclid', 'ref', 'sid', 'sessionid', 'phpsessid'],
+    'CANONICAL_STRIP_TRAILING_SLASH': True,
+    'VISITED_MODE': 'exact',
+    'VISITED_CAPACITY': 1000000,
+    'VISITED_ERROR_RATE': 0.001,
+    'SCOPE_MODE': 'same-host',
+    'SCOPE_ALLOW': [],
+    'SCOPE_DENY': ['checkout', 'cart', 'login', 'register'],
+    'SCOPE_PATH_CAPS': {},
+    'TRAP_MAX_QUERY_VARIANTS': 50,
+    'TRAP_MAX_PATH_DEPTH': 12,
+    'TRAP_MAX_REPEATED_SEGMENT': 3,
+    'PARSE_WORKERS': os.cpu_count() or 1,
+    'PARSE_MAX_PENDING': 0,
     'DATABASE_FILE': 'products.db',
     'BACKUP_DIR': 'backups',
-    'LOG_FILE': 'sayerdark.log'
+    'LOG_FILE': 'sayerdark.log',
+    'LOG_LEVEL': 'INFO',
+    'LOG_FORMAT': 'text',
+    'METRICS_FILE': '',
+    'METRICS_PORT': 0,
+    'SITEMAP_COMPRESS': False,
+    'CLASSIFIER_LEXICON': {
+        'IMPORTANT': {'score': 0.9, 'keywords': ['urgent', 'important', 'critical']},
+        'NEW': {'score': 0.8, 'keywords': ['new', 'fresh', 'latest']}
+    },
+    'CLASSIFIER_DEFAULT_LABEL': 'NORMAL',
+    'CLASSIFIER_DEFAULT_SCORE': 0.5,
+    'CLASSIFIER_WHOLE_WORDS': False,
+    'CLASSIFIER_CACHE_SIZE': 100000,
+    'RATE_MIN': 0.05,
+    'RATE_MAX': 10,
+    'RATE_BURST': 2,
+    'RATE_INCREASE': 0.1,
+    'RATE_DECREASE': 0.5,
+    'RATE_TARGET_LATENCY': 10,
+    'BACKOFF_BASE': 1,
+    'BACKOFF_MAX': 60,
+    'TOR_SOCKS_PROXIES': [],
+    'PROXY_ISOLATED_STREAMS': 0,
+    'PROXY_SLOW_FACTOR': 3,
+    'PROXY_MAX_FAILURES': 3,
+    'PROXY_EJECT_SECONDS': 120
 }
 
 # Random user agents
@@ -81,7 +133,17 @@ def validate_config(config: Dict) -> bool:
                 raise ValueError(f"Missing required configuration field: {field}")
         
         # Validate numeric fields
-        numeric_fields = ['CHECK_INTERVAL', 'MAX_RETRIES', 'TIMEOUT', 'REQUEST_DELAY', 'MAX_DEPTH', 'MAX_PAGES']
+        numeric_fields = ['CHECK_INTERVAL', 'MAX_RETRIES', 'TIMEOUT', 'REQUEST_DELAY', 'MAX_DEPTH', 'MAX_PAGES',
+                          'MAX_CONCURRENCY', 'MAX_PER_HOST', 'POOL_MAXSIZE', 'POOL_IDLE_TIMEOUT',
+                          'PROXY_HEALTH_TTL', 'WRITE_BATCH_SIZE', 'WRITE_FLUSH_INTERVAL',
+                          'MAX_BODY_SIZE', 'PAGE_DEADLINE', 'VISITED_CAPACITY', 'VISITED_ERROR_RATE',
+                          'TRAP_MAX_QUERY_VARIANTS', 'TRAP_MAX_PATH_DEPTH', 'TRAP_MAX_REPEATED_SEGMENT',
+                          'PARSE_WORKERS', 'PARSE_MAX_PENDING', 'METRICS_PORT',
+                          'CLASSIFIER_DEFAULT_SCORE', 'CLASSIFIER_CACHE_SIZE',
+                          'RATE_MIN', 'RATE_MAX', 'RATE_BURST', 'RATE_INCREASE', 'RATE_DECREASE',
+                          'RATE_TARGET_LATENCY', 'BACKOFF_BASE', 'BACKOFF_MAX',
+                          'PROXY_ISOLATED_STREAMS', 'PROXY_SLOW_FACTOR', 'PROXY_MAX_FAILURES',
+                          'PROXY_EJECT_SECONDS']
         for field in numeric_fields:
             if field in config and not isinstance(config[field], (int, float)):
                 raise ValueError(f"Invalid numeric value for {field}")
@@ -89,6 +151,8 @@ def validate_config(config: Dict) -> bool:
         # Validate proxy configuration
         if not isinstance(config['TOR_SOCKS_PROXY'], dict):
             raise ValueError("Invalid TOR_SOCKS_PROXY configuration")
+        if not isinstance(config.get('TOR_SOCKS_PROXIES', []), list):
+            raise ValueError("Invalid TOR_SOCKS_PROXIES configuration")
         
         return True
     except Exception as e:
@@ -105,21 +169,30 @@ def save_config(config: Dict, config_file: str = 'config.json') -> bool:
         print(f"Error saving configuration: {str(e)}")
         return False
 
-# Load configuration
-config = load_config()
+# Configuration is loaded on first use, not at import time
+CONFIG_FILE = 'config.json'
+_config = None
+
+def use_config_file(config_file: str) -> None:
+    """Point the lazy loader at another file; takes effect on next access"""
+    global CONFIG_FILE, _config
+    CONFIG_FILE = config_file
+    _config = None
+
+def get_config() -> Dict:
+    """Return the merged configuration, loading it on first call"""
+    global _config
+    if _config is None:
+        _config = load_config(CONFIG_FILE)
+    return _config
 
-# Export configuration values
-TOR_SOCKS_PROXY = config['TOR_SOCKS_PROXY']
-USER_AGENT = config['USER_AGENT']
-CHECK_INTERVAL = config['CHECK_INTERVAL']
-MAX_RETRIES = config['MAX_RETRIES']
-TIMEOUT = config['TIMEOUT']
-REQUEST_DELAY = config['REQUEST_DELAY']
-MAX_DEPTH = config['MAX_DEPTH']
-MAX_PAGES = config['MAX_PAGES']
-DATABASE_FILE = config['DATABASE_FILE']
-BACKUP_DIR = config['BACKUP_DIR']
-LOG_FILE = config['LOG_FILE']
+def __getattr__(name: str):
+    # Exported configuration values, e.g. `from config import MAX_DEPTH`
+    if name == 'config':
+        return get_config()
+    if name in DEFAULT_CONFIG:
+        return get_config()[name]
+    raise AttributeError(f"module 'config' has no attribute '{name}'")
 
 # List of keywords for search
 KEYWORDS = [
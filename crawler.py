@@ -0,0 +1,251 @@
+import asyncio
+import time
+from collections import deque
+from urllib.parse import urlparse
+from config import MAX_DEPTH, MAX_PAGES, MAX_CONCURRENCY, MAX_PER_HOST, MAX_RETRIES
+from urlnorm import canonicalize, make_visited
+from ratelimit import RetryLater, default_limiter
+from logs import get_logger
+from metrics import CRAWL_ERRORS, RETRIES
+
+log = get_logger('crawler')
+
+# Links containing these fragments are never followed
+EXCLUDED_PATTERNS = ['checkout', 'cart', 'login', 'register']
+
+def is_excluded(url):
+    """Check whether a link points to a page the crawler must not follow"""
+    return any(x in url for x in EXCLUDED_PATTERNS)
+
+class Crawler:
+    """
+    Breadth-first crawl engine built on an asyncio work queue.
+
+    fetch(url) returns a response (or None on failure) and
+    handle_page(url, depth, response) returns the links found on the page.
+    Both are blocking callables and run in worker threads, so the number
+    of requests in flight is bounded by `concurrency` globally and by
+    `per_host` for every host.
+
+    Requests are paced per host by `limiter` (see ratelimit.RateLimiter).
+    A URL whose host has no token yet, or already has `per_host` requests
+    in flight, is set aside and requeued later, so workers never wait on
+    one host while others have work. A fetch that raises RetryLater is
+    retried after an exponential, jittered backoff (or the server's
+    Retry-After), up to `max_retries` attempts in all.
+
+    Links are followed only if `scope` (see scope.CrawlScope) allows them;
+    without one, only the EXCLUDED_PATTERNS are filtered out. Variants of
+    one page are recognised by their canonical form (see
+    urlnorm.canonicalize), but a URL is fetched exactly as it was linked.
+
+    At most `max_pages` pages are fetched per crawl. With a `frontier`
+    (see frontier.Frontier) every queued URL and its outcome is persisted,
+    so an interrupted crawl resumes instead of restarting.
+    """
+
+    def __init__(self, fetch, handle_page, max_depth=MAX_DEPTH,
+                 concurrency=MAX_CONCURRENCY, per_host=MAX_PER_HOST,
+                 visited=None, max_pages=MAX_PAGES, frontier=None, scope=None,
+                 limiter=None, max_retries=MAX_RETRIES):
+        self.fetch = fetch
+        self.handle_page = handle_page
+        self.max_depth = max_depth
+        self.concurrency = max(1, int(concurrency))
+        self.per_host = max(1, int(per_host))
+        self.visited = visited if visited is not None else make_visited()
+        self.max_pages = max_pages
+        self.frontier = frontier
+        self.scope = scope
+        self.limiter = limiter if limiter is not None else default_limiter
+        self.max_retries = max(1, int(max_retries))
+        self.pages_crawled = 0
+        self.pages_started = 0
+        self._attempts = {}
+        self._in_flight = {}
+        self._parked = {}
+        self._timers = {}
+
+    def _requeue(self, queue, item):
+        # The item's original task stays unfinished until it is back in
+        # the queue, so queue.join() cannot return in between
+        self._timers.pop(item, None)
+        queue.put_nowait(item)
+        queue.task_done()
+
+    def _defer(self, queue, item, delay):
+        """Put a URL back on the queue after `delay` seconds"""
+        self._timers[item] = asyncio.get_running_loop().call_later(
+            delay, self._requeue, queue, item)
+
+    def _drop_waiting(self, queue):
+        """
+        Once the page budget is spent, let go of the URLs set aside before
+        their first fetch, parked or on a timer; retries in progress stay
+        """
+        for host, parked in self._parked.items():
+            keep = deque()
+            for item in parked:
+                if item[0] in self._attempts:
+                    keep.append(item)
+                else:
+                    queue.task_done()
+            self._parked[host] = keep
+        for item, timer in list(self._timers.items()):
+            if item[0] not in self._attempts:
+                timer.cancel()
+                del self._timers[item]
+                queue.task_done()
+
+    def _release(self, queue, host):
+        """Free a host's request slot and wake one URL parked on it"""
+        self._in_flight[host] -= 1
+        parked = self._parked.get(host)
+        if parked:
+            self._requeue(queue, parked.popleft())
+
+    def _enqueue(self, queue, url, depth, scoped=False):
+        """
+        Queue a URL once, respecting depth rules and, for discovered links
+        (`scoped`), the crawl scope; returns True if queued
+        """
+        key = canonicalize(url)
+        if depth > self.max_depth or key in self.visited:
+            return False
+        if scoped and not self._in_scope(url):
+            return False
+        self.visited.add(key)
+        queue.put_nowait((url, depth))
+        if scoped and self.scope is not None:
+            # Only a newly queued page counts against the scope's caps
+            self.scope.record(url)
+        return True
+
+    def _in_scope(self, url):
+        if self.scope is not None:
+            return self.scope.allows(url)
+        return not is_excluded(url)
+
+    def _budget_left(self):
+        return not self.max_pages or self.pages_started < self.max_pages
+
+    async def _process(self, queue, url, depth):
+        """
+        Fetch one page, hand it to the page handler and queue its links.
+        Returns True if the URL was set aside to be processed again later.
+        """
+        first_attempt = url not in self._attempts
+        if first_attempt and not self._budget_left():
+            self._drop_waiting(queue)
+            return False
+
+        host = urlparse(url).netloc
+        if self._in_flight.get(host, 0) >= self.per_host:
+            self._parked.setdefault(host, deque()).append((url, depth))
+            return True
+        wait = self.limiter.try_acquire(host)
+        if wait > 0:
+            self._defer(queue, (url, depth), wait)
+            return True
+
+        if first_attempt:
+            self.pages_started += 1
+            self._attempts[url] = 0
+            if not self._budget_left():
+                self._drop_waiting(queue)
+        self._in_flight[host] = self._in_flight.get(host, 0) + 1
+        started = time.monotonic()
+        retry = None
+        try:
+            response = await asyncio.to_thread(self.fetch, url)
+        except RetryLater as e:
+            response, retry = None, e
+        finally:
+            self._release(queue, host)
+        self.limiter.record(host, time.monotonic() - started,
+                            failed=retry is not None,
+                            throttled=retry is not None and retry.throttled,
+                            retry_after=retry.retry_after if retry else None)
+
+        if retry is not None:
+            self._attempts[url] += 1
+            if self._attempts[url] < self.max_retries:
+                delay = self.limiter.backoff(self._attempts[url], retry.retry_after)
+                RETRIES.inc()
+                log.warning("Attempt %d for %s failed (%s), retrying in %.1fs",
+                            self._attempts[url], url, retry, delay)
+                self._defer(queue, (url, depth), delay)
+                return True
+            log.error("Giving up on %s after %d attempts: %s", url, self._attempts[url], retry)
+        del self._attempts[url]
+
+        if response is None:
+            if self.frontier:
+                self.frontier.mark_failed(url, str(retry) if retry else 'fetch failed')
+            return False
+        self.pages_crawled += 1
+
+        try:
+            links = await asyncio.to_thread(self.handle_page, url, depth, response)
+        except Exception as e:
+            if self.frontier:
+                self.frontier.mark_failed(url, str(e))
+            raise
+
+        queued = []
+        if depth < self.max_depth:
+            for link in links or ():
+                if self._enqueue(queue, link, depth + 1, scoped=True):
+                    queued.append((link, depth + 1))
+        if self.frontier:
+            if queued:
+                self.frontier.add_many(queued)
+            self.frontier.mark_done(url)
+        return False
+
+    async def _worker(self, queue):
+        while True:
+            url, depth = await queue.get()
+            deferred = False
+            try:
+                deferred = await self._process(queue, url, depth)
+            except Exception as e:
+                CRAWL_ERRORS.inc()
+                log.error("Unexpected error crawling %s: %s", url, e, extra={'url': url})
+            finally:
+                if not deferred:
+                    queue.task_done()
+
+    async def run(self, start_url, depth=0):
+        """Crawl from start_url until the queue is drained"""
+        queue = asyncio.Queue()
+        self._attempts = {}
+        self._in_flight = {}
+        self._parked = {}
+        self._timers = {}
+        if self.frontier:
+            known, pending, self.pages_started = self.frontier.start(start_url, depth)
+            for url in known:
+                self.visited.add(canonicalize(url))
+            for url, url_depth in pending:
+                queue.put_nowait((url, url_depth))
+        else:
+            self._enqueue(queue, start_url, depth)
+
+        workers = [asyncio.create_task(self._worker(queue))
+                   for _ in range(self.concurrency)]
+        try:
+            await queue.join()
+        finally:
+            for timer in self._timers.values():
+                timer.cancel()
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        if self.frontier:
+            self.frontier.finish()
+        return self.pages_crawled
+
+    def crawl(self, start_url, depth=0):
+        """Blocking entry point for synchronous callers"""
+        return asyncio.run(self.run(start_url, depth))
@@ -1,12 +1,32 @@
 import sqlite3
 import json
 import os
+import queue
 import shutil
+import threading
 from datetime import datetime
-from config import DATABASE_FILE
+from config import DATABASE_FILE, WRITE_BATCH_SIZE, WRITE_FLUSH_INTERVAL
+from logs import get_logger
+from prices import parse_price
+from metrics import DB_WRITE_SECONDS, DB_ROWS
 
-conn = sqlite3.connect(DATABASE_FILE)
-cursor = conn.cursor()
+log = get_logger('db')
+
+_local = threading.local()
+
+def connect(database_file=DATABASE_FILE):
+    """Open a connection in WAL mode so readers never block the writer"""
+    conn = sqlite3.connect(database_file, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+def get_connection():
+    """Return this thread's connection, opening it on first use"""
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = _local.conn = connect()
+    return conn
 
 def backup_database():
     """Create a backup of the database"""
@@ -18,17 +38,18 @@ def backup_database():
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         backup_file = os.path.join(backup_dir, f"database_{timestamp}.db")
         
+        # Fold the WAL into the main file so the copy is complete
+        get_connection().execute('PRAGMA wal_checkpoint(TRUNCATE)')
         shutil.copy2(DATABASE_FILE, backup_file)
-        print(f"Database backed up to {backup_file}")
+        log.info("Database backed up to %s", backup_file)
         return True
     except Exception as e:
-        print(f"Error backing up database: {str(e)}")
+        log.error("Error backing up database: %s", e, exc_info=True)
         return False
 
 def setup_db():
-    # Drop old tables if they exist
-    cursor.execute('DROP TABLE IF EXISTS products')
-    cursor.execute('DROP TABLE IF EXISTS markets')
+    conn = get_connection()
+    cursor = conn.cursor()
     
     # Products table
     cursor.execute('''
@@ -41,6 +62,11 @@ def setup_db():
             last_seen TEXT,
             first_seen TEXT,
             price_history TEXT,
+            price_amount REAL,
+            currency TEXT,
+            label TEXT,
+            label_score REAL,
+            page_url TEXT,
             UNIQUE(market, product_name)
         )
     ''')
@@ -57,91 +83,667 @@ def setup_db():
         )
     ''')
     
+    # Append-only price observations, one row per new product or price change
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS price_observations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER NOT NULL REFERENCES products(id),
+            price TEXT,
+            observed_at TEXT NOT NULL,
+            price_amount REAL,
+            currency TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_price_observations_product
+        ON price_observations (product_id, observed_at)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_price_observations_time
+        ON price_observations (observed_at)
+    ''')
+    
+    # Numeric price columns arrived later; older triggers do not copy them
+    price_columns_added = add_price_columns(cursor)
+    add_columns(cursor, 'products', (('label', 'TEXT'), ('label_score', 'REAL')))
+    page_url_added = add_columns(cursor, 'products', (('page_url', 'TEXT'),))
+    if price_columns_added:
+        cursor.execute('DROP TRIGGER IF EXISTS products_price_insert')
+        cursor.execute('DROP TRIGGER IF EXISTS products_price_update')
+    
+    # Record observations in SQL so upserts never read the old price back
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS products_price_insert
+        AFTER INSERT ON products
+        BEGIN
+            INSERT INTO price_observations (product_id, price, observed_at, price_amount, currency)
+            VALUES (NEW.id, NEW.price, strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime'),
+                    NEW.price_amount, NEW.currency);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS products_price_update
+        AFTER UPDATE OF price ON products
+        WHEN OLD.price IS NOT NEW.price
+        BEGIN
+            INSERT INTO price_observations (product_id, price, observed_at, price_amount, currency)
+            VALUES (NEW.id, NEW.price, strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime'),
+                    NEW.price_amount, NEW.currency);
+        END
+    ''')
+    
+    # Conditional-fetch metadata per market page for monitoring rounds;
+    # it is only a cache, so an older single-key layout is simply rebuilt
+    columns = [row[1] for row in cursor.execute('PRAGMA table_info(page_fetches)')]
+    if columns and ('market' not in columns or page_url_added):
+        # Re-parse every page once, so products learn the page that lists them
+        cursor.execute('DROP TABLE page_fetches')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS page_fetches (
+            market TEXT,
+            url TEXT,
+            etag TEXT,
+            last_modified TEXT,
+            body_hash TEXT,
+            links TEXT,
+            fetched_at TEXT,
+            PRIMARY KEY (market, url)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_url ON products (url)')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_products_page_url
+        ON products (market, page_url)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_products_market_last_seen
+        ON products (market, last_seen)
+    ''')
+    
+    summary_exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'market_summary'"
+    ).fetchone()
+    create_market_summary(cursor)
+    if not summary_exists:
+        rebuild_market_summary(cursor)
+    
     conn.commit()
+    migrate_price_history()
+    if price_columns_added:
+        backfill_prices()
+
+def add_columns(cursor, table, columns):
+    """Add any of the (name, type) columns a table lacks; returns True if any were added"""
+    existing = [row[1] for row in cursor.execute(f'PRAGMA table_info({table})')]
+    added = False
+    for column, kind in columns:
+        if column not in existing:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {kind}')
+            added = True
+    return added
+
+def add_price_columns(cursor):
+    """Add price_amount and currency to older tables; returns True if added"""
+    added = False
+    for table in ('products', 'price_observations'):
+        added |= add_columns(cursor, table, (('price_amount', 'REAL'), ('currency', 'TEXT')))
+    return added
 
-def add_or_update_product(market, product_name, price, url=None):
-    """Add or update product with error handling"""
+def backfill_prices(chunk_size=10000):
+    """
+    Fill price_amount and currency from the raw price text wherever the
+    amount is missing, for products and price observations
+    """
+    conn = get_connection()
+    filled = 0
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
-        cursor = conn.cursor()
-        
-        # Check if product exists
-        cursor.execute("""
-            SELECT id, price, price_history FROM products 
-            WHERE market = ? AND product_name = ?
-        """, (market, product_name))
-        
-        result = cursor.fetchone()
-        
-        if result:
-            # Update existing product
-            product_id, old_price, price_history = result
-            price_history = json.loads(price_history) if price_history else []
-            
-            # Add new price to history if changed
-            if old_price != price:
-                price_history.append({
-                    'price': price,
-                    'timestamp': datetime.now().isoformat()
-                })
+        for table in ('products', 'price_observations'):
+            last_id = 0
+            while True:
+                rows = conn.execute(f'''
+                    SELECT id, price FROM {table}
+                    WHERE id > ? AND price_amount IS NULL AND price IS NOT NULL
+                    ORDER BY id LIMIT ?
+                ''', (last_id, chunk_size)).fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                updates = [(*parse_price(price), row_id) for row_id, price in rows]
+                with conn:
+                    conn.executemany(f'''
+                        UPDATE {table} SET price_amount = ?, currency = ? WHERE id = ?
+                    ''', updates)
+                filled += sum(1 for amount, _, _ in updates if amount is not None)
+        if filled:
+            log.info("Normalized %d stored prices", filled)
+        return filled
+    except sqlite3.Error as e:
+        log.error("Database error normalizing prices: %s", e)
+        return filled
+
+def create_market_summary(cursor):
+    """
+    Per-market counters kept current by triggers on the write path, so
+    stats never scan products. market_activity counts products by the
+    hour of their last_seen; the active count sums the last day of it.
+    The triggers avoid INSERT OR IGNORE, whose conflict policy the outer
+    upsert would override.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS market_summary (
+            market TEXT PRIMARY KEY,
+            total_products INTEGER NOT NULL DEFAULT 0,
+            changed_products INTEGER NOT NULL DEFAULT 0,
+            observations INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS market_activity (
+            market TEXT,
+            hour TEXT,
+            products INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (market, hour)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS products_summary_insert
+        AFTER INSERT ON products
+        BEGIN
+            INSERT INTO market_summary (market) SELECT NEW.market
+            WHERE NOT EXISTS (SELECT 1 FROM market_summary WHERE market = NEW.market);
+            UPDATE market_summary SET total_products = total_products + 1
+            WHERE market = NEW.market;
+            INSERT INTO market_activity (market, hour)
+            SELECT NEW.market, COALESCE(substr(NEW.last_seen, 1, 13), '')
+            WHERE NOT EXISTS (
+                SELECT 1 FROM market_activity
+                WHERE market = NEW.market AND hour = COALESCE(substr(NEW.last_seen, 1, 13), '')
+            );
+            UPDATE market_activity SET products = products + 1
+            WHERE market = NEW.market AND hour = COALESCE(substr(NEW.last_seen, 1, 13), '');
+        END
+    ''')
+    # Fires once per product per hour, not on every sighting
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS products_summary_seen
+        AFTER UPDATE OF last_seen ON products
+        WHEN substr(OLD.last_seen, 1, 13) IS NOT substr(NEW.last_seen, 1, 13)
+        BEGIN
+            UPDATE market_activity SET products = products - 1
+            WHERE market = OLD.market AND hour = COALESCE(substr(OLD.last_seen, 1, 13), '');
+            DELETE FROM market_activity
+            WHERE market = OLD.market AND hour = COALESCE(substr(OLD.last_seen, 1, 13), '')
+              AND products <= 0;
+            INSERT INTO market_activity (market, hour)
+            SELECT NEW.market, COALESCE(substr(NEW.last_seen, 1, 13), '')
+            WHERE NOT EXISTS (
+                SELECT 1 FROM market_activity
+                WHERE market = NEW.market AND hour = COALESCE(substr(NEW.last_seen, 1, 13), '')
+            );
+            UPDATE market_activity SET products = products + 1
+            WHERE market = NEW.market AND hour = COALESCE(substr(NEW.last_seen, 1, 13), '');
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS products_summary_delete
+        AFTER DELETE ON products
+        BEGIN
+            UPDATE market_summary SET total_products = total_products - 1
+            WHERE market = OLD.market;
+            UPDATE market_activity SET products = products - 1
+            WHERE market = OLD.market AND hour = COALESCE(substr(OLD.last_seen, 1, 13), '');
+        END
+    ''')
+    # A product counts as changed when its second observation arrives
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS price_observations_summary
+        AFTER INSERT ON price_observations
+        BEGIN
+            INSERT INTO market_summary (market)
+            SELECT market FROM products p WHERE id = NEW.product_id
+              AND NOT EXISTS (SELECT 1 FROM market_summary WHERE market = p.market);
+            UPDATE market_summary
+            SET observations = observations + 1,
+                changed_products = changed_products + ((
+                    SELECT COUNT(*) FROM (
+                        SELECT 1 FROM price_observations
+                        WHERE product_id = NEW.product_id LIMIT 3
+                    )
+                ) = 2)
+            WHERE market = (SELECT market FROM products WHERE id = NEW.product_id);
+        END
+    ''')
+
+def rebuild_market_summary(cursor=None):
+    """Recompute market_summary and market_activity from the products table"""
+    conn = get_connection()
+    cursor = cursor or conn.cursor()
+    cursor.execute('DELETE FROM market_summary')
+    cursor.execute('DELETE FROM market_activity')
+    cursor.execute('''
+        INSERT INTO market_summary (market, total_products, changed_products, observations)
+        SELECT p.market, COUNT(*), COALESCE(SUM(o.n > 1), 0), COALESCE(SUM(o.n), 0)
+        FROM products p
+        LEFT JOIN (
+            SELECT product_id, COUNT(*) AS n FROM price_observations GROUP BY product_id
+        ) o ON o.product_id = p.id
+        GROUP BY p.market
+    ''')
+    cursor.execute('''
+        INSERT INTO market_activity (market, hour, products)
+        SELECT market, COALESCE(substr(last_seen, 1, 13), ''), COUNT(*)
+        FROM products
+        GROUP BY 1, 2
+    ''')
+
+def migrate_price_history():
+    """
+    Move legacy price_history JSON blobs into price_observations.
+    Migrated rows have their blob cleared, so running it again is a no-op.
+    """
+    conn = get_connection()
+    try:
+        with conn:
+            rows = conn.execute("""
+                SELECT id, price_history FROM products
+                WHERE price_history IS NOT NULL
+            """).fetchall()
             
-            cursor.execute("""
-                UPDATE products 
-                SET price = ?, url = ?, last_seen = CURRENT_TIMESTAMP, price_history = ?
-                WHERE id = ?
-            """, (price, url, json.dumps(price_history), product_id))
-        else:
-            # Add new product
-            price_history = [{
-                'price': price,
-                'timestamp': datetime.now().isoformat()
-            }]
+            for product_id, price_history in rows:
+                try:
+                    entries = json.loads(price_history) or []
+                except ValueError:
+                    entries = []
+                conn.executemany("""
+                    INSERT INTO price_observations (product_id, price, observed_at,
+                                                    price_amount, currency)
+                    VALUES (?, ?, ?, ?, ?)
+                """, [(product_id, entry.get('price'), entry.get('timestamp', ''),
+                       *parse_price(entry.get('price')))
+                      for entry in entries if isinstance(entry, dict)])
             
-            cursor.execute("""
-                INSERT INTO products (market, product_name, price, url, price_history)
-                VALUES (?, ?, ?, ?, ?)
-            """, (market, product_name, price, url, json.dumps(price_history)))
-        
-        conn.commit()
+            conn.execute("UPDATE products SET price_history = NULL WHERE price_history IS NOT NULL")
+        if rows:
+            log.info("Migrated price history of %d products", len(rows))
+        return len(rows)
+    except sqlite3.Error as e:
+        log.error("Database error: %s", e, exc_info=True)
+        return 0
+
+# Upsert one product; the price triggers append to price_observations
+UPSERT_PRODUCT_SQL = """
+    INSERT INTO products (market, product_name, price, url, first_seen, last_seen,
+                          price_amount, currency, label, label_score, page_url)
+    VALUES (:market, :product_name, :price, :url, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP,
+            :price_amount, :currency, :label, :label_score, :page_url)
+    ON CONFLICT(market, product_name) DO UPDATE SET
+        label = COALESCE(excluded.label, products.label),
+        label_score = COALESCE(excluded.label_score, products.label_score),
+        page_url = COALESCE(excluded.page_url, products.page_url),
+        price_amount = excluded.price_amount,
+        currency = excluded.currency,
+        price = excluded.price,
+        url = excluded.url,
+        last_seen = CURRENT_TIMESTAMP
+"""
+
+# Store a page's validators and fingerprint; written in the same
+# transaction as the page's products
+SAVE_FETCH_SQL = """
+    INSERT INTO page_fetches (market, url, etag, last_modified, body_hash, links, fetched_at)
+    VALUES (:market, :url, :etag, :last_modified, :body_hash, :links, CURRENT_TIMESTAMP)
+    ON CONFLICT(market, url) DO UPDATE SET
+        etag = excluded.etag,
+        last_modified = excluded.last_modified,
+        body_hash = excluded.body_hash,
+        links = excluded.links,
+        fetched_at = excluded.fetched_at
+"""
+
+# Mark the products listed on an unchanged page as still seen
+TOUCH_PRODUCTS_SQL = """
+    UPDATE products SET last_seen = CURRENT_TIMESTAMP
+    WHERE market = :market AND page_url = :page_url
+"""
+
+def _fetch_row(market, url, etag, last_modified, body_hash, links):
+    return {
+        'market': market,
+        'url': url,
+        'etag': etag,
+        'last_modified': last_modified,
+        'body_hash': body_hash,
+        'links': json.dumps(sorted(links))
+    }
+
+def _product_row(market, product_name, price, url=None, label=None, label_score=None,
+                 page_url=None):
+    # Normalized here, in the crawl threads, so the writer only writes
+    amount, currency = parse_price(price)
+    return {
+        'market': market,
+        'product_name': product_name,
+        'price': price,
+        'url': url,
+        'price_amount': amount,
+        'currency': currency,
+        'label': label,
+        'label_score': label_score,
+        'page_url': page_url
+    }
+
+def add_or_update_product(market, product_name, price, url=None, label=None, label_score=None):
+    """Add or update product; a None label keeps the stored one"""
+    try:
+        conn = get_connection()
+        with conn:
+            conn.execute(UPSERT_PRODUCT_SQL, _product_row(market, product_name, price, url,
+                                                          label, label_score))
         return True
     except sqlite3.Error as e:
-        print(f"Database error: {str(e)}")
+        log.error("Database error: %s", e, exc_info=True)
         return False
-    finally:
-        if conn:
+
+def _entry_size(entry):
+    # Product rows of a writer queue entry; a touch or the stop marker counts as one
+    return max(1, len(entry[0])) if entry is not None else 1
+
+class ProductWriter:
+    """
+    Single writer for product observations.
+
+    Any number of crawl workers call submit(), submit_page() or
+    touch_page(); a background thread owns the only write connection and
+    writes queued entries in order, in batches of up to `batch_size`
+    product rows, one transaction per batch. A page with more products
+    than that is split, and its fetch fingerprint commits in the same
+    transaction as its last products, so a page is never taken as
+    unchanged while its products are missing. Call flush() to
+    wait for everything submitted so far and close() on shutdown.
+    """
+
+    def __init__(self, database_file=DATABASE_FILE, batch_size=WRITE_BATCH_SIZE,
+                 flush_interval=WRITE_FLUSH_INTERVAL):
+        self.database_file = database_file
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=self.batch_size * 10)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._held = None
+        self.written = 0
+        self.batches = 0
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def submit(self, market, product_name, price, url=None, label=None, label_score=None):
+        """Queue a product observation for the next batch"""
+        self._start()
+        self._queue.put(([_product_row(market, product_name, price, url, label, label_score)],
+                         None, None))
+
+    def submit_page(self, market, page_url, products, etag=None, last_modified=None,
+                    body_hash=None, links=()):
+        """
+        Queue the products of a parsed page, as dicts with 'title', 'price',
+        'url' and optionally 'label' and 'label_score', together with the
+        page's fetch fingerprint
+        """
+        self._start()
+        rows = [_product_row(market, p['title'], p['price'], p.get('url'), p.get('label'),
+                             p.get('label_score'), page_url) for p in products]
+        parts = [rows[i:i + self.batch_size] for i in range(0, len(rows), self.batch_size)]
+        for part in parts[:-1]:
+            self._queue.put((part, None, None))
+        self._queue.put((parts[-1] if parts else [],
+                         _fetch_row(market, page_url, etag, last_modified, body_hash, links),
+                         None))
+
+    def touch_page(self, market, page_url):
+        """Queue a last_seen update for the products listed on an unchanged page"""
+        self._start()
+        self._queue.put(([], None, {'market': market, 'page_url': page_url}))
+
+    def _next_batch(self):
+        """
+        Block for the first entry, then take whatever else is queued up to
+        `batch_size` rows; an entry that does not fit starts the next batch
+        """
+        if self._held is not None:
+            batch, self._held = [self._held], None
+        else:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                return []
+        size = _entry_size(batch[0])
+        while size < self.batch_size and batch[-1] is not None:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is not None and size + _entry_size(entry) > self.batch_size:
+                self._held = entry
+                break
+            batch.append(entry)
+            size += _entry_size(entry)
+        return batch
+
+    def _write(self, conn, entries):
+        rows = [row for entry_rows, _, _ in entries for row in entry_rows]
+        fetches = [fetch for _, fetch, _ in entries if fetch is not None]
+        touches = [touch for _, _, touch in entries if touch is not None]
+        try:
+            with DB_WRITE_SECONDS.time(), conn:
+                conn.executemany(UPSERT_PRODUCT_SQL, rows)
+                conn.executemany(SAVE_FETCH_SQL, fetches)
+                conn.executemany(TOUCH_PRODUCTS_SQL, touches)
+            self.written += len(rows)
+            self.batches += 1
+            DB_ROWS.inc(len(rows))
+        except sqlite3.Error as e:
+            log.error("Database error writing %d products: %s", len(rows), e)
+
+    def _run(self):
+        conn = connect(self.database_file)
+        try:
+            while True:
+                batch = self._next_batch()
+                if not batch:
+                    continue
+                stop = batch[-1] is None
+                entries = batch[:-1] if stop else batch
+                if entries:
+                    self._write(conn, entries)
+                for _ in batch:
+                    self._queue.task_done()
+                if stop:
+                    break
+        finally:
             conn.close()
 
+    def flush(self):
+        """Wait until every submitted observation has been committed"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self):
+        """Flush pending observations and stop the writer thread"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._thread = None
+
+# Shared writer used by the crawler
+product_writer = ProductWriter()
+
+def get_fetch_metadata(market, url):
+    """Return the stored ETag, Last-Modified, body hash and links for a page"""
+    cursor = get_connection().cursor()
+    cursor.execute('''
+        SELECT etag, last_modified, body_hash, links FROM page_fetches
+        WHERE market = ? AND url = ?
+    ''', (market, url))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    etag, last_modified, body_hash, links = row
+    return {
+        'etag': etag,
+        'last_modified': last_modified,
+        'body_hash': body_hash,
+        'links': json.loads(links) if links else []
+    }
+
+def save_fetch_metadata(market, url, etag, last_modified, body_hash, links):
+    """Store the validators and fingerprint of a freshly parsed page"""
+    try:
+        conn = get_connection()
+        with conn:
+            conn.execute(SAVE_FETCH_SQL, _fetch_row(market, url, etag, last_modified,
+                                                    body_hash, links))
+        return True
+    except sqlite3.Error as e:
+        log.error("Database error: %s", e, exc_info=True)
+        return False
+
 def product_exists(market, product_name):
+    cursor = get_connection().cursor()
     cursor.execute('SELECT * FROM products WHERE market=? AND product_name=?', 
                   (market, product_name))
     return cursor.fetchone()
 
-def update_market_status(market_name, status, error_count=0):
+def update_market_status(market_name, status, error_count=0, url=None):
     """Update market status with error handling"""
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
+        conn = get_connection()
         cursor = conn.cursor()
         
         cursor.execute("""
-            INSERT OR REPLACE INTO markets (name, last_check, status, error_count)
-            VALUES (?, ?, ?, ?)
-        """, (market_name, datetime.now().isoformat(), status, error_count))
+            INSERT INTO markets (name, url, last_check, status, error_count)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                url = COALESCE(excluded.url, markets.url),
+                last_check = excluded.last_check,
+                status = excluded.status,
+                error_count = excluded.error_count
+        """, (market_name, url, datetime.now().isoformat(), status, error_count))
         
         conn.commit()
         return True
     except sqlite3.Error as e:
-        print(f"Database error: {str(e)}")
+        log.error("Database error: %s", e, exc_info=True)
         return False
-    finally:
-        if conn:
-            conn.close()
+
+# Products seen in the last day, to the hour, from the activity buckets
+ACTIVE_PRODUCTS_SQL = '''
+    SELECT COALESCE(SUM(products), 0) FROM market_activity
+    WHERE market = ms.market AND hour >= substr(datetime('now', '-1 day'), 1, 13)
+'''
 
 def get_market_stats(market_name):
+    """
+    Return (total_products, active_products, products_with_price_changes)
+    from market_summary; the cost does not depend on the number of products
+    """
+    cursor = get_connection().cursor()
+    cursor.execute(f'''
+        SELECT ms.total_products, ({ACTIVE_PRODUCTS_SQL}), ms.changed_products
+        FROM market_summary ms
+        WHERE ms.market = ?
+    ''', (market_name,))
+    return cursor.fetchone() or (0, 0, 0)
+
+def get_market_summaries():
+    """Return {market: stats dict} for every market in one query"""
+    cursor = get_connection().cursor()
+    cursor.execute(f'''
+        SELECT ms.market, ms.total_products, ({ACTIVE_PRODUCTS_SQL}),
+               ms.changed_products, ms.observations
+        FROM market_summary ms
+        ORDER BY ms.market
+    ''')
+    return {
+        market: {
+            'total_products': total,
+            'active_products': active,
+            'products_with_price_changes': changed,
+            'price_observations': observations
+        }
+        for market, total, active, changed, observations in cursor.fetchall()
+    }
+
+def get_price_history(market, product_name):
+    """Return [(price, observed_at)] for one product, oldest first"""
+    cursor = get_connection().cursor()
     cursor.execute('''
-        SELECT COUNT(*) as total_products,
-               COUNT(CASE WHEN last_seen > datetime('now', '-1 day') THEN 1 END) as active_products,
-               COUNT(CASE WHEN price_history != '[]' THEN 1 END) as products_with_price_changes
+        SELECT o.price, o.observed_at
+        FROM products p
+        JOIN price_observations o ON o.product_id = p.id
+        WHERE p.market = ? AND p.product_name = ?
+        ORDER BY o.observed_at, o.id
+    ''', (market, product_name))
+    return cursor.fetchall()
+
+def get_price_changes_since(since, market=None):
+    """
+    Return [(market, product_name, price, observed_at)] for every
+    observation newer than `since` (a datetime or ISO string)
+    """
+    if isinstance(since, datetime):
+        since = since.isoformat()
+    query = '''
+        SELECT p.market, p.product_name, o.price, o.observed_at
+        FROM price_observations o
+        JOIN products p ON p.id = o.product_id
+        WHERE o.observed_at > ?
+    '''
+    params = [since]
+    if market is not None:
+        query += ' AND p.market = ?'
+        params.append(market)
+    query += ' ORDER BY o.observed_at, o.id'
+    cursor = get_connection().cursor()
+    cursor.execute(query, params)
+    return cursor.fetchall()
+
+def list_markets():
+    """Return the names of all markets with stored products or status"""
+    cursor = get_connection().cursor()
+    cursor.execute('''
+        SELECT name FROM markets
+        UNION
+        SELECT market FROM market_summary
+        ORDER BY 1
+    ''')
+    return [name for (name,) in cursor.fetchall()]
+
+def iter_products(market=None, seen_since=None):
+    """
+    Yield stored products as dicts, optionally for one market and only
+    those seen after `seen_since` (a 'YYYY-MM-DD HH:MM:SS' UTC string)
+    """
+    query = '''
+        SELECT market, product_name, price, url, first_seen, last_seen, label
         FROM products
-        WHERE market = ?
-    ''', (market_name,))
-    return cursor.fetchone()
+    '''
+    conditions = []
+    params = []
+    if market is not None:
+        conditions.append('market = ?')
+        params.append(market)
+    if seen_since is not None:
+        conditions.append('last_seen > ?')
+        params.append(seen_since)
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    query += ' ORDER BY market, product_name'
+    cursor = get_connection().cursor()
+    cursor.execute(query, params)
+    columns = [column[0] for column in cursor.description]
+    for row in cursor:
+        yield dict(zip(columns, row))
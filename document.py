@@ -0,0 +1,91 @@
+import codecs
+import importlib.util
+import re
+from bs4 import BeautifulSoup
+import config
+
+_META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.I)
+_BOMS = [
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16')
+]
+
+def pick_builder(backend=None):
+    """
+    Resolve the BeautifulSoup tree builder to use, by default the
+    configured PARSER_BACKEND. 'auto' picks lxml when it is installed
+    and falls back to html.parser.
+    """
+    backend = backend or config.PARSER_BACKEND
+    if backend == 'auto':
+        return 'lxml' if importlib.util.find_spec('lxml') else 'html.parser'
+    return backend
+
+# Resolved once at import so each page does not repeat the lookup
+DEFAULT_BUILDER = pick_builder()
+
+def _known_encoding(name):
+    try:
+        return codecs.lookup(name.decode('ascii') if isinstance(name, bytes) else name).name
+    except (LookupError, UnicodeDecodeError):
+        return None
+
+def sniff_charset(body, content_type=''):
+    """
+    Cheap charset detection: BOM, then the Content-Type header, then a
+    <meta charset> in the first 2 KB. Returns None when nothing is declared.
+    """
+    for bom, encoding in _BOMS:
+        if body.startswith(bom):
+            return encoding
+    for param in content_type.split(';')[1:]:
+        key, _, value = param.partition('=')
+        if key.strip().lower() == 'charset':
+            encoding = _known_encoding(value.strip().strip('"\''))
+            if encoding:
+                return encoding
+    match = _META_CHARSET.search(body[:2048])
+    if match:
+        return _known_encoding(match.group(1))
+    return None
+
+class ParsedDocument:
+    """
+    A page parsed once and shared by every extractor.
+
+    The HTML is only parsed on first access to `soup`, so callers that
+    never need the tree pay nothing. Raw bytes are handed to the parser
+    with the sniffed `encoding` tried first.
+    """
+
+    def __init__(self, html, url=None, builder=None, encoding=None):
+        self.html = html
+        self.url = url
+        self.builder = builder or DEFAULT_BUILDER
+        self.encoding = encoding
+        self._soup = None
+
+    @property
+    def soup(self):
+        if self._soup is None:
+            if isinstance(self.html, bytes):
+                self._soup = BeautifulSoup(self.html, self.builder,
+                                           from_encoding=self.encoding or 'utf-8')
+            else:
+                self._soup = BeautifulSoup(self.html, self.builder)
+        return self._soup
+
+def as_document(page, url=None):
+    """Wrap raw HTML in a ParsedDocument, passing existing documents through"""
+    if isinstance(page, ParsedDocument):
+        return page
+    return ParsedDocument(page, url)
+
+def as_soup(page):
+    """Return the parse tree for raw HTML, a ParsedDocument or a soup"""
+    if isinstance(page, ParsedDocument):
+        return page.soup
+    if isinstance(page, BeautifulSoup):
+        return page
+    return ParsedDocument(page).soup
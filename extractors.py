@@ -0,0 +1,148 @@
+import logging
+from urllib.parse import urljoin, urlparse, urldefrag
+from document import as_soup
+from logs import get_logger
+import product_matcher
+from urlnorm import canonicalize
+
+log = get_logger('extractors')
+
+def is_valid_url(url):
+    """Validate URL format"""
+    try:
+        result = urlparse(url)
+        return all([result.scheme, result.netloc])
+    except:
+        return False
+
+def extract_meta_info(soup):
+    """Extract meta information from the page"""
+    soup = as_soup(soup)
+    meta_info = {}
+    
+    # Extract title
+    title = soup.find('title')
+    if title:
+        meta_info['title'] = title.text.strip()
+    
+    # Extract description
+    description = soup.find('meta', attrs={'name': 'description'})
+    if description:
+        meta_info['description'] = description.get('content', '')
+    
+    # Extract keywords
+    keywords = soup.find('meta', attrs={'name': 'keywords'})
+    if keywords:
+        meta_info['keywords'] = keywords.get('content', '')
+    
+    return meta_info
+
+def extract_forms(soup, page_url):
+    """Extract forms from the page"""
+    soup = as_soup(soup)
+    forms = []
+    for form in soup.find_all('form'):
+        form_info = {
+            'action': urljoin(page_url, form.get('action', '')),
+            'method': form.get('method', 'get'),
+            'inputs': []
+        }
+        
+        for input_field in form.find_all(['input', 'select', 'textarea']):
+            input_info = {
+                'type': input_field.get('type', 'text'),
+                'name': input_field.get('name', ''),
+                'id': input_field.get('id', ''),
+                'required': input_field.get('required', False)
+            }
+            form_info['inputs'].append(input_info)
+        
+        forms.append(form_info)
+    return forms
+
+def extract_resources(soup, page_url):
+    """Extract resources from the page"""
+    soup = as_soup(soup)
+    resources = {
+        'images': [],
+        'scripts': [],
+        'styles': []
+    }
+    
+    # Extract images
+    for img in soup.find_all('img'):
+        src = img.get('src', '')
+        if src:
+            resources['images'].append({
+                'url': urljoin(page_url, src),
+                'alt': img.get('alt', '')
+            })
+    
+    # Extract scripts
+    for script in soup.find_all('script'):
+        src = script.get('src', '')
+        if src:
+            resources['scripts'].append(urljoin(page_url, src))
+    
+    # Extract CSS files
+    for style in soup.find_all('link', rel='stylesheet'):
+        href = style.get('href', '')
+        if href:
+            resources['styles'].append(urljoin(page_url, href))
+    
+    return resources
+
+def extract_products(html, url, matcher=None):
+    """Extract products from the page; each one is logged at DEBUG"""
+    soup = as_soup(html)
+    matcher = matcher or product_matcher.default_matcher
+    products = []
+    debug = log.isEnabledFor(logging.DEBUG)
+    
+    def report(error):
+        log.warning("Error extracting product on %s: %s", url, error)
+    
+    # One pass finds every listing container; nested matches that both
+    # hold a product are collapsed to one
+    for product_info in matcher.extract_all(soup, url, on_error=report):
+        products.append(product_info)
+        if debug:
+            log.debug("Product found: %s - %s", product_info['title'],
+                      product_info['price'], extra={'url': url})
+    
+    return products
+
+def extract_anchors(html, base_url):
+    """
+    Index all valid links in a single pass over the anchors.
+    Returns {canonical url: {'url', 'text', 'rel'}} in document order.
+    The canonical form only identifies the page; 'url' is the absolute
+    link without its fragment, which is what gets fetched. The text is
+    taken from the first anchor whose href is exactly the absolute URL,
+    as the earlier per-link soup.find lookup did.
+    """
+    soup = as_soup(html)
+    anchors = {}
+    absolute_urls = {}
+    first_by_href = {}
+    
+    for a in soup.find_all('a', href=True):
+        href = a['href']
+        first_by_href.setdefault(href, a)
+        full_url = urljoin(base_url, href)
+        if not is_valid_url(full_url):
+            continue
+        canonical = canonicalize(full_url)
+        if canonical not in anchors:
+            anchors[canonical] = {'url': urldefrag(full_url)[0], 'rel': a.get('rel', [])}
+            absolute_urls[canonical] = full_url
+    
+    for canonical, anchor in anchors.items():
+        a = first_by_href.get(absolute_urls[canonical])
+        anchor['text'] = a.text.strip() if a else ''
+    
+    return anchors
+
+def extract_links(html, base_url):
+    """Extract all valid links from HTML content, one per canonical URL"""
+    return {anchor['url'] for anchor in extract_anchors(html, base_url).values()}
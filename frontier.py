@@ -0,0 +1,107 @@
+from config import DATABASE_FILE, MAX_RETRIES
+from db import connect
+from logs import get_logger
+
+log = get_logger('frontier')
+
+class Frontier:
+    """
+    Crawl frontier persisted in SQLite so an interrupted crawl resumes
+    where it stopped.
+
+    Every URL the crawler queues is stored with its depth, status
+    ('pending', 'done' or 'failed'), attempt count and last error. Rows
+    belong to a crawl_id and are cleared once that crawl completes.
+    """
+
+    def __init__(self, crawl_id, database_file=DATABASE_FILE, max_attempts=MAX_RETRIES):
+        self.crawl_id = crawl_id
+        self.max_attempts = max_attempts
+        self.conn = connect(database_file)
+        with self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS frontier (
+                    crawl_id TEXT,
+                    url TEXT,
+                    depth INTEGER,
+                    status TEXT DEFAULT 'pending',
+                    attempts INTEGER DEFAULT 0,
+                    last_error TEXT,
+                    updated_at TEXT,
+                    PRIMARY KEY (crawl_id, url)
+                )
+            ''')
+            self.conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_frontier_status
+                ON frontier (crawl_id, status)
+            ''')
+
+    def start(self, start_url, depth=0):
+        """
+        Resume an unfinished crawl or start a new one.
+        Returns (known_urls, pending, pages_done): every URL already queued,
+        the (url, depth) pairs still to fetch and the pages already fetched.
+        """
+        with self.conn:
+            # Failed pages get another chance while they have attempts left
+            self.conn.execute('''
+                UPDATE frontier SET status = 'pending'
+                WHERE crawl_id = ? AND status = 'failed' AND attempts < ?
+            ''', (self.crawl_id, self.max_attempts))
+            pending = self.conn.execute('''
+                SELECT url, depth FROM frontier
+                WHERE crawl_id = ? AND status = 'pending'
+                ORDER BY depth
+            ''', (self.crawl_id,)).fetchall()
+            if not pending:
+                self.conn.execute('DELETE FROM frontier WHERE crawl_id = ?', (self.crawl_id,))
+
+        if pending:
+            known = {url for (url,) in self.conn.execute(
+                'SELECT url FROM frontier WHERE crawl_id = ?', (self.crawl_id,))}
+            pages_done = len(known) - len(pending)
+            log.info("Resuming crawl with %d pending pages (%d already done)",
+                     len(pending), pages_done)
+            return known, pending, pages_done
+
+        self.add_many([(start_url, depth)])
+        return {start_url}, [(start_url, depth)], 0
+
+    def has_pending(self):
+        """True if an earlier run of this crawl was interrupted"""
+        return self.conn.execute('''
+            SELECT 1 FROM frontier WHERE crawl_id = ? AND status != 'done' LIMIT 1
+        ''', (self.crawl_id,)).fetchone() is not None
+
+    def add_many(self, entries):
+        """Record newly queued (url, depth) pairs"""
+        with self.conn:
+            self.conn.executemany('''
+                INSERT OR IGNORE INTO frontier (crawl_id, url, depth, updated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ''', [(self.crawl_id, url, depth) for url, depth in entries])
+
+    def mark_done(self, url):
+        with self.conn:
+            self.conn.execute('''
+                UPDATE frontier
+                SET status = 'done', attempts = attempts + 1, updated_at = CURRENT_TIMESTAMP
+                WHERE crawl_id = ? AND url = ?
+            ''', (self.crawl_id, url))
+
+    def mark_failed(self, url, error):
+        with self.conn:
+            self.conn.execute('''
+                UPDATE frontier
+                SET status = 'failed', attempts = attempts + 1, last_error = ?,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE crawl_id = ? AND url = ?
+            ''', (error, self.crawl_id, url))
+
+    def finish(self):
+        """Clear a completed crawl so the next run starts from the root"""
+        with self.conn:
+            self.conn.execute('DELETE FROM frontier WHERE crawl_id = ?', (self.crawl_id,))
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,209 @@
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from config import (
+    POOL_MAXSIZE, POOL_IDLE_TIMEOUT,
+    MAX_BODY_SIZE, PAGE_DEADLINE, ALLOWED_CONTENT_TYPES
+)
+from document import sniff_charset
+
+CHUNK_SIZE = 64 * 1024
+
+class ResponseRejected(Exception):
+    """Raised when a response is abandoned before it is fully downloaded"""
+
+class FetchedPage:
+    """A fully downloaded page body with the metadata the crawler needs"""
+
+    def __init__(self, url, status_code, headers, content):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.encoding = sniff_charset(content, headers.get('Content-Type', ''))
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+def _proxy_for(url, proxies):
+    """Return the proxy URL that requests would use for this URL"""
+    if not proxies:
+        return None
+    return proxies.get(urlparse(url).scheme)
+
+class SessionPool:
+    """
+    Keep-alive HTTP sessions keyed by (scheme, host, proxy).
+
+    Each session owns a urllib3 connection pool of at most `maxsize`
+    connections, so TCP, SOCKS and TLS setup is paid once per host and
+    reused across pages, retries and monitoring rounds. A request that
+    finds every connection busy waits for one to be returned rather than
+    opening a throwaway extra one. Sessions idle for longer than `idle_timeout`
+    seconds are closed on the next lookup; idle time counts from the end
+    of the last request, and a session with requests in flight is never
+    closed, however long a slow download runs.
+    """
+
+    def __init__(self, maxsize=POOL_MAXSIZE, idle_timeout=POOL_IDLE_TIMEOUT):
+        self.maxsize = max(1, int(maxsize))
+        self.idle_timeout = idle_timeout
+        self._sessions = {}
+        self._last_used = {}
+        self._in_use = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _new_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.maxsize,
+                              pool_block=True)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _lookup(self, url, proxies):
+        parsed = urlparse(url)
+        key = (parsed.scheme, parsed.netloc, _proxy_for(url, proxies))
+        now = time.monotonic()
+        self._evict_idle(now)
+        session = self._sessions.get(key)
+        if session is None:
+            session = self._new_session()
+            if proxies:
+                session.proxies.update(proxies)
+            self._sessions[key] = session
+            self.misses += 1
+        else:
+            self.hits += 1
+        self._last_used[key] = now
+        return key, session
+
+    def session_for(self, url, proxies=None):
+        """Return the pooled session for a URL and proxy pair"""
+        with self._lock:
+            return self._lookup(url, proxies)[1]
+
+    @contextmanager
+    def _checkout(self, url, proxies):
+        """Hold a session for the length of one request"""
+        with self._lock:
+            key, session = self._lookup(url, proxies)
+            self._in_use[key] = self._in_use.get(key, 0) + 1
+        try:
+            yield session
+        finally:
+            with self._lock:
+                self._in_use[key] -= 1
+                if not self._in_use[key]:
+                    del self._in_use[key]
+                self._last_used[key] = time.monotonic()
+
+    def get(self, url, proxies=None, **kwargs):
+        """Issue a GET through the pooled session for this URL"""
+        with self._checkout(url, proxies) as session:
+            return session.get(url, proxies=proxies, **kwargs)
+
+    def fetch(self, url, proxies=None, max_bytes=MAX_BODY_SIZE, deadline=PAGE_DEADLINE,
+              content_types=ALLOWED_CONTENT_TYPES, **kwargs):
+        """
+        Stream a GET and return a FetchedPage. Raises ResponseRejected as
+        soon as the Content-Type is not allowed, the body grows past
+        `max_bytes` or the download runs past `deadline` seconds.
+        """
+        started = time.monotonic()
+        with self._checkout(url, proxies) as session:
+            return self._download(session.get(url, proxies=proxies, stream=True, **kwargs),
+                                  started, max_bytes, deadline, content_types)
+
+    def _download(self, response, started, max_bytes, deadline, content_types):
+        """Read a streamed response into a FetchedPage within the limits"""
+        try:
+            response.raise_for_status()
+            
+            content_type = response.headers.get('Content-Type', '')
+            mime = content_type.split(';')[0].strip().lower()
+            if mime and content_types and mime not in content_types:
+                raise ResponseRejected(f"content type {mime}")
+            
+            length = response.headers.get('Content-Length', '')
+            if max_bytes and length.isdigit() and int(length) > max_bytes:
+                raise ResponseRejected(f"{length} bytes exceeds limit of {max_bytes}")
+            
+            chunks = []
+            size = 0
+            for chunk in response.iter_content(CHUNK_SIZE):
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise ResponseRejected(f"body exceeds limit of {max_bytes} bytes")
+                if deadline and time.monotonic() - started > deadline:
+                    raise ResponseRejected(f"download exceeded {deadline}s deadline")
+                chunks.append(chunk)
+            
+            return FetchedPage(response.url, response.status_code,
+                               response.headers, b''.join(chunks))
+        finally:
+            # Returns the connection to the pool once fully read, drops it otherwise
+            response.close()
+
+    def _evict_idle(self, now):
+        for key, last_used in list(self._last_used.items()):
+            if now - last_used > self.idle_timeout and key not in self._in_use:
+                self._sessions.pop(key).close()
+                del self._last_used[key]
+                self.evictions += 1
+
+    def evict_idle(self):
+        """Close sessions that have been idle longer than the timeout"""
+        with self._lock:
+            self._evict_idle(time.monotonic())
+
+    def _connection_counts(self):
+        """Sum requests and new connections over all urllib3 pools"""
+        requests_made = 0
+        connections = 0
+        for session in self._sessions.values():
+            adapter = session.get_adapter('http://')
+            managers = [adapter.poolmanager] + list(adapter.proxy_manager.values())
+            for manager in managers:
+                for key in manager.pools.keys():
+                    pool = manager.pools.get(key)
+                    if pool is not None:
+                        requests_made += pool.num_requests
+                        connections += pool.num_connections
+        return requests_made, connections
+
+    def stats(self):
+        """Return session and connection reuse statistics"""
+        with self._lock:
+            requests_made, connections = self._connection_counts()
+            lookups = self.hits + self.misses
+            return {
+                'sessions': len(self._sessions),
+                'session_hits': self.hits,
+                'session_misses': self.misses,
+                'session_hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'requests': requests_made,
+                'new_connections': connections,
+                'connection_reuse_rate': (
+                    1 - connections / requests_made if requests_made else 0.0
+                )
+            }
+
+    def close(self):
+        """Close every pooled session"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+            self._last_used.clear()
+
+# Shared pool used by the crawler and the Tor checks
+default_pool = SessionPool()
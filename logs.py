@@ -0,0 +1,89 @@
+"""
+Leveled, structured logging for the crawler.
+
+Console lines keep the "[*]" / "[!]" style of the interactive prints.
+With LOG_FORMAT 'json' each record is written as one JSON object that
+includes any fields passed through `extra=`. Per-page and per-product
+detail is logged at DEBUG behind log.isEnabledFor() checks, so at the
+default INFO level it costs nothing.
+"""
+import json
+import logging
+import sys
+
+PREFIXES = {
+    logging.DEBUG: '[-]',
+    logging.INFO: '[*]',
+    logging.WARNING: '[!]',
+    logging.ERROR: '[!]',
+    logging.CRITICAL: '[!]'
+}
+
+# LogRecord attributes that are not user-supplied fields
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+_settings = {}
+
+class ConsoleFormatter(logging.Formatter):
+    def format(self, record):
+        text = f"{PREFIXES.get(record.levelno, '[*]')} {record.getMessage()}"
+        if record.exc_info:
+            text += '\n' + self.formatException(record.exc_info)
+        return text
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+def get_logger(name):
+    """Return the logger for a module, under the 'sayerdark' hierarchy"""
+    return logging.getLogger(f"sayerdark.{name}")
+
+def setup_logging(level=None, fmt=None, log_file=None):
+    """
+    Configure the 'sayerdark' loggers from LOG_LEVEL, LOG_FORMAT and
+    LOG_FILE unless given explicitly. Safe to call again, e.g. in worker
+    processes.
+    """
+    import config
+    level = (level or config.LOG_LEVEL).upper()
+    fmt = fmt or config.LOG_FORMAT
+    log_file = config.LOG_FILE if log_file is None else log_file
+
+    root = logging.getLogger('sayerdark')
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    root.setLevel(level)
+    root.propagate = False
+
+    formatter = JsonFormatter() if fmt == 'json' else ConsoleFormatter()
+    console = logging.StreamHandler(sys.stderr)
+    console.setFormatter(formatter)
+    root.addHandler(console)
+
+    if log_file:
+        file_handler = logging.FileHandler(log_file, encoding='utf-8')
+        # The file always gets timestamps
+        file_handler.setFormatter(JsonFormatter() if fmt == 'json' else logging.Formatter(
+            '%(asctime)s %(levelname)s %(name)s: %(message)s'))
+        root.addHandler(file_handler)
+
+    _settings.update(level=level, fmt=fmt, log_file=log_file)
+
+def current_settings():
+    """Arguments that reproduce this process's setup_logging() call"""
+    if not _settings:
+        return ()
+    return (_settings['level'], _settings['fmt'], _settings['log_file'])
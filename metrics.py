@@ -0,0 +1,225 @@
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Bucket upper bounds; +Inf is always appended
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+COUNT_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 500)
+
+def _label_text(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels) + '}'
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic counter, optionally split by label values"""
+    kind = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        return self._values.get(key, 0)
+
+    def snapshot(self):
+        with self._lock:
+            return [{'labels': dict(zip(self.labelnames, key)), 'value': value}
+                    for key, value in self._values.items()]
+
+    def render(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_label_text(zip(self.labelnames, key))} {_number(value)}"
+
+class Histogram:
+    """Cumulative-bucket histogram with a running sum and count"""
+    kind = 'histogram'
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._counts = [0] * len(self.buckets)
+        self._sum = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self._counts[i] += 1
+                    break
+            self._sum += value
+            self._count += 1
+
+    @contextmanager
+    def time(self):
+        """Observe the wall time of the with-block in seconds"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def snapshot(self):
+        with self._lock:
+            cumulative, buckets = 0, {}
+            for bound, count in zip(self.buckets, self._counts):
+                cumulative += count
+                buckets[_number(bound)] = cumulative
+            return {'count': self._count, 'sum': self._sum,
+                    'mean': self._sum / self._count if self._count else 0.0,
+                    'buckets': buckets}
+
+    def render(self):
+        snapshot = self.snapshot()
+        for bound, count in snapshot['buckets'].items():
+            yield f'{self.name}_bucket{{le="{bound}"}} {count}'
+        yield f"{self.name}_sum {_number(snapshot['sum'])}"
+        yield f"{self.name}_count {snapshot['count']}"
+
+class Registry:
+    """Named metrics with JSON snapshot and text exposition output"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help, labelnames=()):
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help, buckets))
+
+    def snapshot(self):
+        """Return every metric as plain data"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {
+            'timestamp': time.time(),
+            'metrics': {m.name: {'type': m.kind, 'help': m.help, 'values': m.snapshot()}
+                        for m in metrics}
+        }
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def write_snapshot(self, path):
+        """Write the JSON snapshot atomically, so readers never see half a file"""
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=4)
+        os.replace(tmp, path)
+
+class MetricsServer:
+    """
+    Serve a registry on localhost: /metrics in text format and
+    /metrics.json as the JSON snapshot. Runs in a daemon thread.
+    """
+
+    def __init__(self, registry, port, host='127.0.0.1'):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?')[0]
+                if path == '/metrics':
+                    body = registry.render().encode('utf-8')
+                    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+                elif path == '/metrics.json':
+                    body = json.dumps(registry.snapshot()).encode('utf-8')
+                    content_type = 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever,
+                                        name='metrics-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+# Process-wide registry and the pipeline's metrics
+registry = Registry()
+
+FETCH_SECONDS = registry.histogram(
+    'sayerdark_fetch_seconds', 'Time to download a page, per attempt')
+FETCH_BYTES = registry.histogram(
+    'sayerdark_fetch_bytes', 'Size of downloaded page bodies', SIZE_BUCKETS)
+FETCHES = registry.counter(
+    'sayerdark_fetches_total', 'Fetch attempts by outcome', ('outcome',))
+RETRIES = registry.counter(
+    'sayerdark_fetch_retries_total', 'Fetch attempts that were retried')
+PARSE_SECONDS = registry.histogram(
+    'sayerdark_parse_seconds', 'Time to parse a page and index its links')
+EXTRACT_SECONDS = registry.histogram(
+    'sayerdark_extract_seconds', 'Time to extract products or page structure')
+PRODUCTS_PER_PAGE = registry.histogram(
+    'sayerdark_products_per_page', 'Products extracted from each parsed page', COUNT_BUCKETS)
+PAGES = registry.counter(
+    'sayerdark_pages_total', 'Pages handled by mode and result', ('mode', 'result'))
+DB_WRITE_SECONDS = registry.histogram(
+    'sayerdark_db_write_seconds', 'Time to commit one batch of product rows')
+DB_ROWS = registry.counter(
+    'sayerdark_db_rows_written_total', 'Product rows committed by the writer')
+CRAWL_ERRORS = registry.counter(
+    'sayerdark_crawl_errors_total', 'Pages that failed with an unexpected error')
+CLASSIFICATIONS = registry.counter(
+    'sayerdark_classifications_total', 'Listing texts classified, by cache result', ('result',))
+PROXY_REQUESTS = registry.counter(
+    'sayerdark_proxy_requests_total', 'Requests sent through each proxy endpoint', ('endpoint', 'outcome'))
+PROXY_EJECTIONS = registry.counter(
+    'sayerdark_proxy_ejections_total', 'Times a proxy endpoint was taken out of rotation', ('endpoint',))
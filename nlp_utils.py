@@ -1,9 +1,110 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+import config
+from config import (
+    CLASSIFIER_LEXICON, CLASSIFIER_DEFAULT_LABEL, CLASSIFIER_DEFAULT_SCORE,
+    CLASSIFIER_WHOLE_WORDS, CLASSIFIER_CACHE_SIZE
+)
+from metrics import CLASSIFICATIONS
+
+class TextClassifier:
+    """
+    Keyword classifier over a lexicon of {label: {'score', 'keywords'}}.
+
+    All keywords are compiled into one case-insensitive regex with a
+    named group per label, so a text is scanned once whatever the size
+    of the lexicon. Labels earlier in the lexicon win when several match.
+    Results are memoized by a hash of the text in an LRU of `cache_size`
+    entries, so listings that do not change between monitoring rounds
+    are never scanned again.
+    """
+
+    def __init__(self, lexicon=CLASSIFIER_LEXICON, default_label=CLASSIFIER_DEFAULT_LABEL,
+                 default_score=CLASSIFIER_DEFAULT_SCORE, whole_words=CLASSIFIER_WHOLE_WORDS,
+                 cache_size=CLASSIFIER_CACHE_SIZE):
+        self.labels = list(lexicon)
+        self.scores = {label: entry['score'] for label, entry in lexicon.items()}
+        self.default = {'label': default_label, 'score': default_score, 'tags': []}
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        groups = []
+        for i, entry in enumerate(lexicon.values()):
+            # Longest first, so 'latest' is not cut short by 'late'
+            words = sorted({w.lower() for w in entry['keywords']}, key=len, reverse=True)
+            if words:
+                groups.append(f"(?P<l{i}>{'|'.join(map(re.escape, words))})")
+        boundary = r'\b' if whole_words else ''
+        # Zero-width lookahead, so overlapping keywords are all found
+        self.pattern = re.compile(
+            f"{boundary}(?=(?:{'|'.join(groups)}){boundary})" if groups else r'(?!)',
+            re.IGNORECASE
+        )
+
+    @classmethod
+    def from_config(cls):
+        """Build the classifier from the config file in use now"""
+        return cls(config.CLASSIFIER_LEXICON, config.CLASSIFIER_DEFAULT_LABEL,
+                   config.CLASSIFIER_DEFAULT_SCORE, config.CLASSIFIER_WHOLE_WORDS,
+                   config.CLASSIFIER_CACHE_SIZE)
+
+    def _score(self, text):
+        found = {int(match.lastgroup[1:]) for match in self.pattern.finditer(text)}
+        if not found:
+            return self.default
+        tags = [self.labels[i] for i in sorted(found)]
+        return {'label': tags[0], 'score': self.scores[tags[0]], 'tags': tags}
+
+    def classify(self, text):
+        return self.classify_many([text])[0]
+
+    def classify_many(self, texts):
+        """Classify a batch of texts; cached results are reused"""
+        keys = [hashlib.blake2b((text or '').encode('utf-8'), digest_size=16).digest()
+                for text in texts]
+        results = [None] * len(texts)
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                result = self._cache.get(key)
+                if result is None:
+                    missing.append(i)
+                else:
+                    self._cache.move_to_end(key)
+                    results[i] = result
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+        CLASSIFICATIONS.inc(len(texts) - len(missing), result='cached')
+        CLASSIFICATIONS.inc(len(missing), result='scored')
+
+        # Scan outside the lock so threads classify in parallel
+        scored = [(keys[i], self._score(texts[i] or '')) for i in missing]
+
+        with self._lock:
+            for (key, result), i in zip(scored, missing):
+                results[i] = result
+                self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return results
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+# Shared classifier; its cache lives as long as the process
+default_classifier = TextClassifier.from_config()
+
 def analyze_text(text):
-    # Simple text analysis
-    text = text.lower()
-    if any(word in text for word in ['urgent', 'important', 'critical']):
-        return {'label': 'IMPORTANT', 'score': 0.9}
-    elif any(word in text for word in ['new', 'fresh', 'latest']):
-        return {'label': 'NEW', 'score': 0.8}
-    else:
-        return {'label': 'NORMAL', 'score': 0.5}
+    """Classify a single text; see TextClassifier"""
+    result = default_classifier.classify(text)
+    return {'label': result['label'], 'score': result['score']}
+
+def product_text(product):
+    """The text of a listing that gets classified"""
+    return ' '.join(filter(None, (product.get('title'), product.get('description'))))
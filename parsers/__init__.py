@@ -0,0 +1,40 @@
+"""
+Market-specific parsers.
+
+Each module in this package is a parser named after itself (the
+'parser' value in config.MARKETS) and exposes parse_products(html, url).
+Modules are discovered without being imported and only loaded the first
+time a market asks for them.
+"""
+import importlib
+import pkgutil
+import threading
+from logs import get_logger
+
+log = get_logger('parsers')
+
+_loaded = {}
+_lock = threading.Lock()
+
+def available_parsers():
+    """Names of the parser modules in this package"""
+    return sorted(name for _, name, is_pkg in pkgutil.iter_modules(__path__)
+                  if not is_pkg and not name.startswith('_'))
+
+def get_parser(name):
+    """Import a parser on first use; returns None if it does not exist"""
+    if not name:
+        return None
+    with _lock:
+        if name not in _loaded:
+            parser = None
+            if name in available_parsers():
+                module = importlib.import_module(f"{__name__}.{name}")
+                if hasattr(module, 'parse_products'):
+                    parser = module
+                else:
+                    log.warning("Parser %s has no parse_products()", name)
+            else:
+                log.warning("Unknown parser: %s", name)
+            _loaded[name] = parser
+        return _loaded[name]
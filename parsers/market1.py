@@ -1,12 +1,15 @@
-from bs4 import BeautifulSoup
+import logging
 from urllib.parse import urljoin
+from document import as_soup
+from logs import get_logger
+from prices import parse_price
+
+log = get_logger('parsers.market1')
 
 def parse(html):
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = as_soup(html)
     products = []
-    
-    # Print HTML structure for verification
-    print("\n[*] Analyzing product structure:")
+    debug = log.isEnabledFor(logging.DEBUG)
     
     # Find all sections containing products
     sections = soup.find_all('div', class_='container')
@@ -15,7 +18,8 @@ def parse(html):
         h2 = section.find('h2')
         if h2:
             section_title = h2.text.strip()
-            print(f"\n[*] Section: {section_title}")
+            if debug:
+                log.debug("Section: %s", section_title)
             
             # Find products in this section
             product_containers = section.find_all('div', class_='product-container')
@@ -33,11 +37,12 @@ def parse(html):
                                 'title': title,
                                 'price': price
                             })
-                            print(f"[+] Product: {title} - {price}")
+                            if debug:
+                                log.debug("Product: %s - %s", title, price)
                 except Exception as e:
-                    print(f"[!] Error parsing product: {e}")
+                    log.warning("Error parsing product: %s", e)
     
-    print(f"\n[*] Total products discovered: {len(products)}")
+    log.debug("Total products discovered: %d", len(products))
     return products
 
 def parse_products(html, url):
@@ -45,14 +50,14 @@ def parse_products(html, url):
     Parse products from HTML with improved error handling
     """
     try:
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = as_soup(html)
         products = []
         
         # Find all product containers
         product_containers = soup.find_all('div', class_='product-container')
         
         if not product_containers:
-            print("No product containers found. Checking alternative selectors...")
+            log.debug("No product containers found on %s, trying alternative selectors", url)
             # Try alternative selectors
             product_containers = soup.find_all(['div', 'article'], class_=['product', 'item', 'listing'])
         
@@ -74,10 +79,8 @@ def parse_products(html, url):
                 if not price_text:
                     continue
                 
-                # Clean and validate price
-                try:
-                    price = float(price_text.replace('$', '').replace(',', '').strip())
-                except ValueError:
+                # Keep the displayed price; db normalizes it on write
+                if parse_price(price_text)[0] is None:
                     continue
                 
                 # Extract URL
@@ -86,16 +89,16 @@ def parse_products(html, url):
                 
                 products.append({
                     'title': title,
-                    'price': price,
+                    'price': price_text,
                     'url': product_url
                 })
                 
             except Exception as e:
-                print(f"Error parsing product container: {str(e)}")
+                log.warning("Error parsing product container: %s", e)
                 continue
         
         return products
         
     except Exception as e:
-        print(f"Error parsing HTML: {str(e)}")
+        log.warning("Error parsing HTML from %s: %s", url, e)
         return []
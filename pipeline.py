@@ -0,0 +1,127 @@
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import config
+import document
+import nlp_utils
+import product_matcher
+from config import PARSE_WORKERS, PARSE_MAX_PENDING
+from document import ParsedDocument
+from extractors import (
+    extract_meta_info, extract_forms, extract_resources,
+    extract_products, extract_anchors
+)
+from parsers import get_parser
+from logs import get_logger, setup_logging, current_settings
+
+log = get_logger('pipeline')
+
+def _init_worker(config_file, logging_settings):
+    """
+    Give a worker the parent's config file and logging settings. A spawned
+    or forkserver worker imports this module, and builds the shared tree
+    builder, matcher and classifier, from the default config.json before
+    it gets here, so those are rebuilt from the parent's file.
+    """
+    config.use_config_file(config_file)
+    document.DEFAULT_BUILDER = document.pick_builder()
+    product_matcher.default_matcher = product_matcher.ProductMatcher.from_config()
+    nlp_utils.default_classifier = nlp_utils.TextClassifier.from_config()
+    if logging_settings:
+        setup_logging(*logging_settings)
+
+def parse_page(url, content, encoding=None, mode='products', parser_name=None):
+    """
+    Parse one page, resolving its links against `url`, and return plain records:
+    {'links': [...], 'products': [...]} in products mode, or
+    {'links': [...], 'page_info': {...}} in structure mode, plus
+    'timings' with the seconds spent parsing and extracting.
+    Runs in a worker process, so it takes and returns only picklable data.
+    """
+    started = time.perf_counter()
+    document = ParsedDocument(content, url, encoding=encoding)
+    anchors = extract_anchors(document, url)
+    records = {'links': [anchor['url'] for anchor in anchors.values()]}
+    parsed = time.perf_counter()
+
+    if mode == 'products':
+        parser = get_parser(parser_name)
+        products = parser.parse_products(document, url) if parser else []
+        if not products:
+            products = extract_products(document, url)
+        records['products'] = products
+    else:
+        records['page_info'] = {
+            'url': url,
+            'meta': extract_meta_info(document),
+            'forms': extract_forms(document, url),
+            'resources': extract_resources(document, url),
+            'links': [{'url': a['url'], 'text': a['text']} for a in anchors.values()]
+        }
+    records['timings'] = {'parse': parsed - started,
+                          'extract': time.perf_counter() - parsed}
+    return records
+
+class ParsePool:
+    """
+    Parsing stage decoupled from fetching.
+
+    Fetch threads hand raw page bytes to a pool of `workers` processes and
+    get plain records back. At most `max_pending` pages are queued for the
+    pool at once; further callers block until a slot frees up, so memory
+    stays bounded however fast pages arrive. With workers=0 pages are
+    parsed in the calling thread. If a worker dies (e.g. killed for
+    memory), the pool is rebuilt and the page is parsed once more.
+    """
+
+    def __init__(self, workers=PARSE_WORKERS, max_pending=PARSE_MAX_PENDING):
+        self.workers = max(0, int(workers))
+        self.max_pending = max_pending or max(1, self.workers * 2)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # Workers read the same config file and log with the same
+                # level and format as this process, however they are started
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_init_worker,
+                    initargs=(config.CONFIG_FILE, current_settings()))
+            return self._executor
+
+    def _reset(self, executor):
+        """Drop a broken executor so the next parse starts fresh workers"""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def parse(self, url, content, encoding=None, mode='products', parser_name=None):
+        """Parse a page in the pool and wait for its records"""
+        if not self.workers:
+            return parse_page(url, content, encoding, mode, parser_name)
+        with self._slots:
+            for attempt in range(2):
+                executor = self._get_executor()
+                try:
+                    return executor.submit(
+                        parse_page, url, content, encoding, mode, parser_name).result()
+                except BrokenProcessPool:
+                    self._reset(executor)
+                    if attempt:
+                        raise
+                    log.warning("Parse worker died, restarting the pool for %s", url)
+
+    def close(self):
+        """Shut down the worker processes"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+# Shared pool; worker processes start on the first parse
+default_parse_pool = ParsePool()
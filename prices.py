@@ -0,0 +1,75 @@
+import re
+
+# Currency symbols and the codes they normalize to
+CURRENCY_SYMBOLS = {
+    '$': 'USD',
+    '€': 'EUR',
+    '£': 'GBP',
+    '₿': 'BTC',
+    'ɱ': 'XMR',
+    'Ξ': 'ETH'
+}
+
+# Written-out codes and names, matched case-insensitively as whole words
+CURRENCY_CODES = {
+    'usd': 'USD', 'usdt': 'USDT', 'eur': 'EUR', 'gbp': 'GBP',
+    'btc': 'BTC', 'bitcoin': 'BTC', 'xbt': 'BTC',
+    'xmr': 'XMR', 'monero': 'XMR',
+    'eth': 'ETH', 'ltc': 'LTC'
+}
+
+_NUMBER = re.compile(r'\d[\d,.\s ]*')
+_CODE = re.compile(r'[a-z]+', re.I)
+_THOUSANDS = re.compile(r'^\d{1,3}([,.\s ]\d{3})+$')
+
+def _to_float(number):
+    """
+    Convert '1,200', '1.200,50', '0.05' or '1 200' to a float. When both
+    separators appear the last one is the decimal point; a lone separator
+    followed by exactly three digits groups thousands if repeated or if
+    it is a comma.
+    """
+    number = number.strip().rstrip('.,')
+    if ',' in number and '.' in number:
+        decimal = ',' if number.rfind(',') > number.rfind('.') else '.'
+        thousands = '.' if decimal == ',' else ','
+        number = number.replace(thousands, '').replace(decimal, '.')
+    elif _THOUSANDS.match(number) and (',' in number or number.count('.') > 1
+                                       or ' ' in number or ' ' in number):
+        number = re.sub(r'[,.\s ]', '', number)
+    else:
+        number = re.sub(r'[\s ]', '', number).replace(',', '.')
+    try:
+        return float(number)
+    except ValueError:
+        return None
+
+def parse_price(price):
+    """
+    Split a displayed price such as "$1,200", "0.05 BTC" or "1.200,50 €"
+    into (amount, currency). Ranges keep their first amount. Returns
+    (None, None) when no amount is found; currency is None when none is
+    shown. Numbers pass straight through.
+    """
+    if price is None:
+        return None, None
+    if isinstance(price, (int, float)):
+        return float(price), None
+
+    text = str(price)
+    match = _NUMBER.search(text)
+    if not match:
+        return None, None
+    amount = _to_float(match.group())
+
+    currency = None
+    for symbol, code in CURRENCY_SYMBOLS.items():
+        if symbol in text:
+            currency = code
+            break
+    if currency is None:
+        for word in _CODE.findall(text):
+            currency = CURRENCY_CODES.get(word.lower())
+            if currency:
+                break
+    return amount, currency
@@ -0,0 +1,206 @@
+from urllib.parse import urljoin
+from bs4 import Tag
+import config
+from config import PRODUCT_SELECTORS, PRICE_SELECTORS, SELECTORS, PRODUCT_NESTING
+
+HEADINGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+DESCRIPTION_CLASSES = ('description', 'details', 'info')
+
+def compile_selector(selector):
+    """
+    Compile a simple 'tag', '.class' or 'tag.class.other' selector into
+    (tag, classes). Anything more complex returns None and is matched
+    with soupsieve instead.
+    """
+    selector = selector.strip()
+    if not selector or any(c in selector for c in ' >+~[]:#,*'):
+        return None
+    tag, *classes = selector.split('.')
+    if not tag and not classes:
+        return None
+    return (tag.lower() or None, frozenset(classes))
+
+def _merge(*groups):
+    """Concatenate selector lists, keeping the first occurrence of each"""
+    seen = []
+    for group in groups:
+        for selector in group:
+            if selector not in seen:
+                seen.append(selector)
+    return seen
+
+class _SelectorSet:
+    """A list of selectors matched against elements without re-walking the tree"""
+
+    def __init__(self, selectors):
+        self.selectors = list(selectors)
+        self.simple = []
+        self.complex = []
+        for priority, selector in enumerate(self.selectors):
+            compiled = compile_selector(selector)
+            if compiled is None:
+                self.complex.append((priority, selector))
+            else:
+                self.simple.append((priority, compiled))
+
+    def match(self, element):
+        """Return the best (lowest) priority of a simple selector matching element"""
+        classes = element.get('class') or ()
+        for priority, (tag, required) in self.simple:
+            if (tag is None or element.name == tag) and required.issubset(classes):
+                return priority
+        return None
+
+class ProductMatcher:
+    """
+    Product extraction compiled from the configured selectors.
+
+    Candidate containers are found in one traversal of the tree, and
+    title, price, description and image are read in one pass over each
+    container. Of nested containers that both yield a product only the
+    outermost or innermost one is kept, so each listing is reported
+    once; a container whose nested candidates yield nothing (e.g. a
+    div.item holding only shipping notes) keeps its product.
+    """
+
+    def __init__(self, product_selectors, price_selectors, title_selectors=(),
+                 nesting=PRODUCT_NESTING):
+        if nesting not in ('outermost', 'innermost'):
+            raise ValueError(f"Invalid nesting mode: {nesting}")
+        self.products = _SelectorSet(product_selectors)
+        self.prices = _SelectorSet(price_selectors)
+        self.titles = _SelectorSet(title_selectors)
+        self.nesting = nesting
+
+    @classmethod
+    def from_config(cls):
+        """Build the matcher from the config file in use now"""
+        return cls(
+            _merge(PRODUCT_SELECTORS, SELECTORS.get('product', [])),
+            _merge(PRICE_SELECTORS, SELECTORS.get('price', [])),
+            SELECTORS.get('title', []),
+            nesting=config.PRODUCT_NESTING
+        )
+
+    def find_candidates(self, soup):
+        """Return every element matching a product selector, in document order"""
+        candidates = []
+        matched = set()
+        for element in soup.find_all(True):
+            if self.products.match(element) is not None:
+                candidates.append(element)
+                matched.add(id(element))
+        for _, selector in self.products.complex:
+            for element in soup.select(selector):
+                if id(element) not in matched:
+                    candidates.append(element)
+                    matched.add(id(element))
+        if self.products.complex:
+            order = {id(e): i for i, e in enumerate(soup.find_all(True))}
+            candidates.sort(key=lambda e: order.get(id(e), 0))
+        return candidates
+
+    def extract_all(self, soup, url, on_error=None):
+        """
+        Return the page's products in document order, one per listing.
+        In innermost mode candidates are tried deepest first and an
+        ancestor of a container that yielded a product is skipped; in
+        outermost mode a descendant of one is. A container that raises
+        is passed to on_error(exception) and skipped.
+        """
+        candidates = self.find_candidates(soup)
+        innermost = self.nesting == 'innermost'
+        extracted = {}
+        covered = set()
+        for element in (reversed(candidates) if innermost else candidates):
+            if id(element) in covered:
+                continue
+            if not innermost and any(id(parent) in extracted for parent in element.parents):
+                continue
+            try:
+                product = self.extract(element, url)
+            except Exception as e:
+                if on_error is None:
+                    raise
+                on_error(e)
+                continue
+            if product:
+                extracted[id(element)] = product
+                if innermost:
+                    covered.update(id(parent) for parent in element.parents)
+        return [extracted[id(e)] for e in candidates if id(e) in extracted]
+
+    def _first_complex(self, selector_set, container):
+        for priority, selector in selector_set.complex:
+            element = container.select_one(selector)
+            if element is not None and element.text.strip():
+                return priority, element.text.strip()
+        return None, None
+
+    def extract(self, container, url):
+        """Return the product dict for a container, or None without title and price"""
+        title = None
+        fallback_title = None
+        fallback_priority = None
+        price = None
+        price_priority = None
+        description = None
+        image = None
+        img_seen = False
+
+        for element in container.descendants:
+            if not isinstance(element, Tag):
+                continue
+            name = element.name
+
+            if title is None and name in HEADINGS:
+                text = element.text.strip()
+                if text:
+                    title = text
+
+            if price_priority != 0:
+                priority = self.prices.match(element)
+                if priority is not None and (price_priority is None or priority < price_priority):
+                    text = element.text.strip()
+                    if text:
+                        price, price_priority = text, priority
+
+            if self.titles.simple and fallback_priority != 0:
+                priority = self.titles.match(element)
+                if priority is not None and (fallback_priority is None or priority < fallback_priority):
+                    text = element.text.strip()
+                    if text:
+                        fallback_title, fallback_priority = text, priority
+
+            if description is None and name in ('p', 'div'):
+                classes = element.get('class') or ()
+                if any(c in DESCRIPTION_CLASSES for c in classes):
+                    description = element.text.strip()
+
+            if not img_seen and name == 'img':
+                img_seen = True
+                if element.get('src'):
+                    image = urljoin(url, element['src'])
+
+        if self.prices.complex:
+            priority, text = self._first_complex(self.prices, container)
+            if priority is not None and (price_priority is None or priority < price_priority):
+                price = text
+        if title is None and self.titles.complex:
+            priority, text = self._first_complex(self.titles, container)
+            if priority is not None and (fallback_priority is None or priority < fallback_priority):
+                fallback_title = text
+
+        title = title or fallback_title
+        if not (title and price):
+            return None
+        return {
+            'title': title,
+            'price': price,
+            'url': url,
+            'description': description,
+            'image': image
+        }
+
+# Matcher compiled from config, shared by every page
+default_matcher = ProductMatcher.from_config()
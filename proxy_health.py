@@ -0,0 +1,66 @@
+import threading
+import time
+from config import PROXY_HEALTH_TTL
+
+class ProxyHealth:
+    """
+    Cached up/down verdict for a proxy.
+
+    probe() is the expensive check (e.g. check_tor_connection) and is only
+    run when the cached verdict is older than `ttl` seconds or has been
+    invalidated after a failed fetch. One instance is shared by all crawl
+    workers; concurrent callers wait for a single probe instead of each
+    running their own.
+    """
+
+    def __init__(self, probe, ttl=PROXY_HEALTH_TTL):
+        self.probe = probe
+        self.ttl = ttl
+        self._verdict = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _fresh(self):
+        return (self._checked_at is not None
+                and time.monotonic() - self._checked_at < self.ttl)
+
+    def _refresh(self):
+        verdict = bool(self.probe())
+        self._verdict = verdict
+        self._checked_at = time.monotonic()
+        return verdict
+
+    def is_up(self):
+        """Return the cached verdict, probing only when it is stale"""
+        if self._fresh():
+            return self._verdict
+        with self._lock:
+            # Another worker may have refreshed while we waited
+            if self._fresh():
+                return self._verdict
+            return self._refresh()
+
+    def invalidate(self):
+        """Drop the cached verdict so the next caller re-probes"""
+        self._checked_at = None
+
+    def _run(self):
+        while not self._stop.wait(self.ttl / 2):
+            with self._lock:
+                self._refresh()
+
+    def start(self):
+        """Refresh the verdict in a background thread every ttl/2 seconds"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background refresh thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
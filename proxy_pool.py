@@ -0,0 +1,178 @@
+import random
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit
+from config import (
+    TOR_SOCKS_PROXY, TOR_SOCKS_PROXIES, PROXY_ISOLATED_STREAMS,
+    PROXY_SLOW_FACTOR, PROXY_MAX_FAILURES, PROXY_EJECT_SECONDS
+)
+from logs import get_logger
+from metrics import PROXY_REQUESTS, PROXY_EJECTIONS
+
+log = get_logger('proxy_pool')
+
+def _with_credentials(url, username, password='x'):
+    """Return a proxy URL carrying SOCKS credentials"""
+    parts = urlsplit(url)
+    host = parts.hostname or ''
+    if parts.port:
+        host = f"{host}:{parts.port}"
+    return urlunsplit((parts.scheme, f"{username}:{password}@{host}", parts.path, '', ''))
+
+def _as_proxies(entry):
+    """Accept a proxy URL or a requests-style {'http', 'https'} dict"""
+    if isinstance(entry, str):
+        return {'http': entry, 'https': entry}
+    return dict(entry)
+
+def proxy_endpoints(primary=TOR_SOCKS_PROXY, extra=TOR_SOCKS_PROXIES,
+                    isolated_streams=PROXY_ISOLATED_STREAMS):
+    """
+    Build the list of proxy dicts from the config: TOR_SOCKS_PROXY
+    followed by every TOR_SOCKS_PROXIES entry. With isolated_streams=N
+    each endpoint is repeated N times with distinct SOCKS credentials;
+    Tor (IsolateSOCKSAuth, on by default) then gives each its own
+    circuits, so one Tor instance carries N independent streams.
+    """
+    endpoints = []
+    for entry in [primary] + list(extra or ()):
+        proxies = _as_proxies(entry)
+        if proxies not in endpoints:
+            endpoints.append(proxies)
+    if isolated_streams and isolated_streams > 1:
+        endpoints = [
+            {scheme: _with_credentials(url, f"sayerdark-{i}") for scheme, url in proxies.items()}
+            for proxies in endpoints for i in range(int(isolated_streams))
+        ]
+    return endpoints
+
+class ProxyEndpoint:
+    """One proxy of the pool with its load, latency and health"""
+
+    def __init__(self, proxies):
+        self.proxies = proxies
+        url = urlsplit(next(iter(proxies.values()), ''))
+        # Never show the password in logs or metrics
+        user = f"{url.username}@" if url.username else ''
+        self.name = f"{user}{url.hostname}:{url.port}"
+        self.outstanding = 0
+        self.latency = None
+        self.samples = 0
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.requests = 0
+        self.errors = 0
+
+    def in_rotation(self, now):
+        return now >= self.ejected_until
+
+    def __repr__(self):
+        return self.name
+
+class ProxyPool:
+    """
+    Spread requests over several proxy endpoints.
+
+    acquire() hands out the endpoint with the fewest requests in flight
+    and release() records how the request went. An endpoint is taken out
+    of rotation for `eject_seconds` after `max_failures` failures in a
+    row, or when its latency runs above `slow_factor` times the median
+    of the others; it comes back with a clean latency record. The last endpoint in
+    rotation is never taken out, and when all are out the least loaded
+    one is used anyway. Shared by all crawl workers.
+    """
+
+    def __init__(self, endpoints, slow_factor=PROXY_SLOW_FACTOR, max_failures=PROXY_MAX_FAILURES,
+                 eject_seconds=PROXY_EJECT_SECONDS, min_samples=5):
+        self.endpoints = [ProxyEndpoint(proxies) for proxies in endpoints]
+        if not self.endpoints:
+            raise ValueError("ProxyPool needs at least one endpoint")
+        self.slow_factor = slow_factor
+        self.max_failures = max_failures
+        self.eject_seconds = eject_seconds
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def _candidates(self, now):
+        for endpoint in self.endpoints:
+            if endpoint.ejected_until and endpoint.in_rotation(now):
+                # Back in rotation: judge it afresh
+                endpoint.ejected_until = 0.0
+                endpoint.latency = None
+                endpoint.samples = 0
+                endpoint.failures = 0
+        return [e for e in self.endpoints if e.in_rotation(now)] or self.endpoints
+
+    def _choose(self, now):
+        # Slow endpoints hold on to their requests longer, so counting
+        # outstanding requests already steers load away from them
+        return min(self._candidates(now), key=lambda e: (e.outstanding, random.random()))
+
+    def peek(self):
+        """Return the endpoint acquire() would pick, without taking it"""
+        with self._lock:
+            return self._choose(time.monotonic())
+
+    def acquire(self):
+        """Take the least loaded endpoint; pair every call with release()"""
+        with self._lock:
+            endpoint = self._choose(time.monotonic())
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def release(self, endpoint, latency, failed=False):
+        """Record the outcome of a request made through `endpoint`"""
+        now = time.monotonic()
+        with self._lock:
+            endpoint.outstanding -= 1
+            if failed:
+                endpoint.errors += 1
+                endpoint.failures += 1
+                PROXY_REQUESTS.inc(endpoint=endpoint.name, outcome='error')
+                if endpoint.failures >= self.max_failures:
+                    self._eject(endpoint, now, f"{endpoint.failures} failures in a row")
+                return
+            PROXY_REQUESTS.inc(endpoint=endpoint.name, outcome='ok')
+            endpoint.failures = 0
+            endpoint.samples += 1
+            endpoint.latency = (latency if endpoint.latency is None
+                                else 0.8 * endpoint.latency + 0.2 * latency)
+            if endpoint.samples >= self.min_samples:
+                others = [e.latency for e in self.endpoints
+                          if e is not endpoint and e.in_rotation(now)
+                          and e.latency is not None and e.samples >= self.min_samples]
+                if others and endpoint.latency > self.slow_factor * statistics.median(others):
+                    self._eject(endpoint, now, f"latency {endpoint.latency:.2f}s")
+
+    def _eject(self, endpoint, now, reason):
+        if not endpoint.in_rotation(now):
+            return
+        if not any(e is not endpoint and e.in_rotation(now) for e in self.endpoints):
+            return
+        endpoint.ejected_until = now + self.eject_seconds
+        PROXY_EJECTIONS.inc(endpoint=endpoint.name)
+        log.warning("Taking proxy %s out of rotation for %ss: %s",
+                    endpoint.name, self.eject_seconds, reason)
+
+    def all_failing(self):
+        """True when the last request through every endpoint in rotation failed"""
+        now = time.monotonic()
+        with self._lock:
+            return all(e.failures for e in self.endpoints if e.in_rotation(now))
+
+    def stats(self):
+        """Return per-endpoint load, latency and health"""
+        now = time.monotonic()
+        with self._lock:
+            return {e.name: {'outstanding': e.outstanding, 'requests': e.requests,
+                             'errors': e.errors, 'latency': e.latency,
+                             'in_rotation': e.in_rotation(now)}
+                    for e in self.endpoints}
+
+    def __str__(self):
+        return ', '.join(e.name for e in self.endpoints)
+
+# Shared pool of the configured Tor endpoints
+default_proxy_pool = ProxyPool(proxy_endpoints())
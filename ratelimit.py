@@ -0,0 +1,142 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from config import (
+    REQUEST_DELAY, RATE_MIN, RATE_MAX, RATE_BURST, RATE_INCREASE, RATE_DECREASE,
+    RATE_TARGET_LATENCY, BACKOFF_BASE, BACKOFF_MAX
+)
+
+class RetryLater(Exception):
+    """
+    Raised by a fetch that failed in a way worth retrying. `throttled`
+    marks 429/503 answers; `retry_after` is the server's Retry-After in
+    seconds, if it sent one.
+    """
+
+    def __init__(self, reason, throttled=False, retry_after=None):
+        super().__init__(reason)
+        self.throttled = throttled
+        self.retry_after = retry_after
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+class HostRate:
+    """Token bucket for one host whose rate adapts to how the host responds"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.decreased_at = 0.0
+        self.latency = None
+
+    def _refill(self, now):
+        # A bucket created after `now` was read must not lose tokens
+        elapsed = max(0.0, now - self.updated)
+        self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+        self.updated = max(self.updated, now)
+
+class RateLimiter:
+    """
+    Per-host request pacing for the crawler.
+
+    Each host has a token bucket starting at one request per
+    REQUEST_DELAY seconds. The rate grows by RATE_INCREASE per fast
+    success (additive increase) and shrinks by RATE_DECREASE on errors,
+    429/503 answers and responses slower than RATE_TARGET_LATENCY
+    (multiplicative decrease, at most once per round trip), within
+    RATE_MIN..RATE_MAX requests per second. A Retry-After pauses the
+    whole host.
+
+    try_acquire() never sleeps: it takes a token or says how long to
+    wait, so callers can set the URL aside and keep working on other
+    hosts. Shared across crawls, so what is learned about a host
+    carries over to the next round.
+    """
+
+    def __init__(self, initial_rate=None, min_rate=RATE_MIN, max_rate=RATE_MAX,
+                 burst=RATE_BURST, increase=RATE_INCREASE, decrease=RATE_DECREASE,
+                 target_latency=RATE_TARGET_LATENCY):
+        if initial_rate is None:
+            initial_rate = 1 / REQUEST_DELAY if REQUEST_DELAY else max_rate
+        self.initial_rate = min(max_rate, max(min_rate, initial_rate))
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = max(1, burst)
+        self.increase = increase
+        self.decrease = decrease
+        self.target_latency = target_latency
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _host(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = HostRate(self.initial_rate, self.burst)
+        return state
+
+    def try_acquire(self, host):
+        """Take a request token for `host`; returns 0, or the seconds to wait"""
+        now = time.monotonic()
+        with self._lock:
+            state = self._host(host)
+            if now < state.blocked_until:
+                return state.blocked_until - now
+            state._refill(now)
+            if state.tokens >= 1:
+                state.tokens -= 1
+                return 0.0
+            return (1 - state.tokens) / state.rate
+
+    def record(self, host, latency, failed=False, throttled=False, retry_after=None):
+        """Adapt the host's rate to the outcome of one request"""
+        now = time.monotonic()
+        with self._lock:
+            state = self._host(host)
+            state.latency = latency if state.latency is None else 0.8 * state.latency + 0.2 * latency
+            slow = state.latency > self.target_latency
+            if throttled or failed or slow:
+                # Requests sent before the last decrease saw the old rate;
+                # count them as the same event rather than cutting again
+                if now - latency >= state.decreased_at:
+                    # Throttling is an explicit request to slow down, so back off harder
+                    factor = self.decrease * self.decrease if throttled else self.decrease
+                    state.rate = max(self.min_rate, state.rate * factor)
+                    state.decreased_at = now
+                if throttled or failed:
+                    state.tokens = min(state.tokens, 0.0)
+            else:
+                state.rate = min(self.max_rate, state.rate + self.increase)
+            if retry_after:
+                state.blocked_until = max(state.blocked_until, now + retry_after)
+
+    def backoff(self, attempt, retry_after=None):
+        """Delay before retry number `attempt`: exponential with full jitter, at least Retry-After"""
+        delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+        return max(delay, retry_after or 0)
+
+    def stats(self):
+        """Return {host: {'rate', 'latency'}} for every host seen"""
+        with self._lock:
+            return {host: {'rate': state.rate, 'latency': state.latency}
+                    for host, state in self._hosts.items()}
+
+# Shared limiter used by the crawler
+default_limiter = RateLimiter()
@@ -1,35 +1,58 @@
+import sys
+
+# Any arguments select the non-interactive command line, which loads
+# only what its subcommand needs
+if __name__ == "__main__" and len(sys.argv) > 1:
+    import cli
+    sys.exit(cli.main())
+
 import requests
 import time
+import hashlib
+import threading
 import random
-import json
-import argparse
-from urllib.parse import urljoin, urlparse
-from bs4 import BeautifulSoup
+from urllib.parse import urlparse
 from config import (
-    TOR_SOCKS_PROXY, USER_AGENTS, KEYWORDS,
-    PRODUCT_SELECTORS, PRICE_SELECTORS,
-    MAX_RETRIES, TIMEOUT, REQUEST_DELAY,
+    USER_AGENTS, TIMEOUT,
     MAX_DEPTH, MAX_PAGES, CHECK_INTERVAL,
-    MARKETS
+    MAX_CONCURRENCY, MAX_PER_HOST, MARKETS,
+    METRICS_FILE, METRICS_PORT, SITEMAP_COMPRESS
 )
-from db import setup_db, add_or_update_product, update_market_status
-from parsers import market1
-from nlp_utils import analyze_text
+from crawler import Crawler
+from frontier import Frontier
+from urlnorm import make_visited
+from scope import CrawlScope
+from scheduler import MarketScheduler
+from http_pool import default_pool, ResponseRejected
+from ratelimit import RetryLater, parse_retry_after
+from proxy_health import ProxyHealth
+from proxy_pool import default_proxy_pool
+from db import setup_db, product_writer, get_fetch_metadata
+from pipeline import default_parse_pool
+from sitemap import SiteMapWriter, record_paths, build_summary
+from logs import get_logger, setup_logging
+from metrics import (
+    registry, MetricsServer,
+    FETCH_SECONDS, FETCH_BYTES, FETCHES,
+    PARSE_SECONDS, EXTRACT_SECONDS, PRODUCTS_PER_PAGE, PAGES
+)
+from nlp_utils import default_classifier, product_text
 
-# Global crawling variables
-visited_pages = set()
-site_structure = {
-    'url': '',
-    'title': '',
-    'description': '',
-    'pages': [],
-    'forms': [],
-    'links': [],
-    'images': [],
-    'scripts': [],
-    'styles': [],
-    'meta': {}
-}
+log = get_logger('sayerdark')
+
+class CrawlStats:
+    """Per-crawl page counters, updated from the crawl worker threads"""
+    
+    def __init__(self):
+        self.pages = 0
+        self.unchanged = 0
+        self._lock = threading.Lock()
+    
+    def count_page(self, unchanged=False):
+        with self._lock:
+            self.pages += 1
+            if unchanged:
+                self.unchanged += 1
 
 def print_banner():
     banner = """
@@ -45,170 +68,14 @@ def print_banner():
     """
     print(banner)
 
-def reset_crawler():
-    """Reset crawler variables"""
-    global visited_pages, site_structure
-    visited_pages.clear()
-    site_structure = {
-        'url': '',
-        'title': '',
-        'description': '',
-        'pages': [],
-        'forms': [],
-        'links': [],
-        'images': [],
-        'scripts': [],
-        'styles': [],
-        'meta': {}
-    }
-
 def get_random_user_agent():
     """Get a random user agent from the list"""
     return random.choice(USER_AGENTS)
 
-def is_valid_url(url):
-    """Validate URL format"""
+def check_tor_connection(proxies=None):
+    """Check if Tor is running and accessible through `proxies`"""
     try:
-        result = urlparse(url)
-        return all([result.scheme, result.netloc])
-    except:
-        return False
-
-def extract_meta_info(soup):
-    """Extract meta information from the page"""
-    meta_info = {}
-    
-    # Extract title
-    title = soup.find('title')
-    if title:
-        meta_info['title'] = title.text.strip()
-    
-    # Extract description
-    description = soup.find('meta', attrs={'name': 'description'})
-    if description:
-        meta_info['description'] = description.get('content', '')
-    
-    # Extract keywords
-    keywords = soup.find('meta', attrs={'name': 'keywords'})
-    if keywords:
-        meta_info['keywords'] = keywords.get('content', '')
-    
-    return meta_info
-
-def extract_forms(soup, page_url):
-    """Extract forms from the page"""
-    forms = []
-    for form in soup.find_all('form'):
-        form_info = {
-            'action': urljoin(page_url, form.get('action', '')),
-            'method': form.get('method', 'get'),
-            'inputs': []
-        }
-        
-        for input_field in form.find_all(['input', 'select', 'textarea']):
-            input_info = {
-                'type': input_field.get('type', 'text'),
-                'name': input_field.get('name', ''),
-                'id': input_field.get('id', ''),
-                'required': input_field.get('required', False)
-            }
-            form_info['inputs'].append(input_info)
-        
-        forms.append(form_info)
-    return forms
-
-def extract_resources(soup, page_url):
-    """Extract resources from the page"""
-    resources = {
-        'images': [],
-        'scripts': [],
-        'styles': []
-    }
-    
-    # Extract images
-    for img in soup.find_all('img'):
-        src = img.get('src', '')
-        if src:
-            resources['images'].append({
-                'url': urljoin(page_url, src),
-                'alt': img.get('alt', '')
-            })
-    
-    # Extract scripts
-    for script in soup.find_all('script'):
-        src = script.get('src', '')
-        if src:
-            resources['scripts'].append(urljoin(page_url, src))
-    
-    # Extract CSS files
-    for style in soup.find_all('link', rel='stylesheet'):
-        href = style.get('href', '')
-        if href:
-            resources['styles'].append(urljoin(page_url, href))
-    
-    return resources
-
-def extract_products(html, url):
-    """Extract products from the page with improved display"""
-    soup = BeautifulSoup(html, 'html.parser')
-    products = []
-    
-    # Search for products using all selectors
-    for selector in PRODUCT_SELECTORS:
-        for product in soup.select(selector):
-            try:
-                # Search for title
-                title = None
-                for h in product.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
-                    if h.text.strip():
-                        title = h.text.strip()
-                        break
-                
-                # Search for price
-                price = None
-                for price_selector in PRICE_SELECTORS:
-                    price_elem = product.select_one(price_selector)
-                    if price_elem and price_elem.text.strip():
-                        price = price_elem.text.strip()
-                        break
-                
-                # Search for description
-                description = None
-                desc_elem = product.find(['p', 'div'], class_=['description', 'details', 'info'])
-                if desc_elem:
-                    description = desc_elem.text.strip()
-                
-                # Search for image
-                image = None
-                img_elem = product.find('img')
-                if img_elem and img_elem.get('src'):
-                    image = urljoin(url, img_elem['src'])
-                
-                if title and price:
-                    product_info = {
-                        'title': title,
-                        'price': price,
-                        'url': url,
-                        'description': description,
-                        'image': image
-                    }
-                    products.append(product_info)
-                    print(f"\n[+] Product Found:")
-                    print(f"    Title: {title}")
-                    print(f"    Price: {price}")
-                    if description:
-                        print(f"    Description: {description[:100]}...")
-                    if image:
-                        print(f"    Image: {image}")
-            except Exception as e:
-                print(f"[!] Error extracting product: {e}")
-    
-    return products
-
-def check_tor_connection():
-    """Check if Tor is running and accessible"""
-    try:
-        print("[*] Checking Tor connection...")
+        log.info("Checking Tor connection...")
         # Try multiple Tor check URLs
         check_urls = [
             'https://check.torproject.org/',
@@ -218,68 +85,52 @@ def check_tor_connection():
         
         for url in check_urls:
             try:
-                response = requests.get(
+                response = default_pool.get(
                     url,
-                    proxies=TOR_SOCKS_PROXY,
+                    proxies=proxies,
                     timeout=30,
                     verify=False  # Disable SSL verification
                 )
                 if 'Congratulations' in response.text or 'Tor Project' in response.text:
-                    print("[+] Tor connection successful!")
+                    log.info("Tor connection successful")
                     return True
             except requests.exceptions.SSLError:
                 continue
             except requests.exceptions.RequestException:
                 continue
         
-        print("[!] Could not verify Tor connection")
+        log.warning("Could not verify Tor connection")
         return False
         
     except Exception as e:
-        print(f"[!] Tor connection error: {str(e)}")
-        print("[*] Please check if Tor is running and properly configured")
+        log.error("Tor connection error: %s", e)
+        log.error("Please check if Tor is running and properly configured")
         return False
 
+# Shared, TTL-cached verdict of check_tor_connection, probed through
+# the endpoint the proxy pool would use next
+tor_health = ProxyHealth(lambda: check_tor_connection(default_proxy_pool.peek().proxies))
+
 def setup_proxies(url):
-    """Setup appropriate proxy based on site type"""
+    """Return the proxy pool to use for a URL, or None for a direct connection"""
     if ".onion" in url:
-        if not check_tor_connection():
-            print("[!] Cannot access .onion sites without working Tor connection")
-            print("[*] Please ensure Tor is running and properly configured")
-            print("[*] You can start Tor service using: sudo service tor start")
+        if not tor_health.is_up():
+            log.warning("Cannot access .onion sites without working Tor connection; "
+                        "ensure Tor is running (e.g. sudo service tor start)")
             return None
-        print("[*] Using Tor for dark web access")
-        return TOR_SOCKS_PROXY
-    else:
-        print("[*] Direct connection to site")
+        log.debug("Using Tor for %s", url)
+        return default_proxy_pool
+    log.debug("Direct connection to %s", url)
     return None
 
-def extract_links(html, base_url):
-    """Extract all valid links from HTML content"""
-    soup = BeautifulSoup(html, 'html.parser')
-    links = set()
-    
-    for a in soup.find_all('a', href=True):
-        href = a['href']
-        full_url = urljoin(base_url, href)
-        if is_valid_url(full_url):
-            links.add(full_url)
-    
-    return links
-
-def crawl_page(url, depth=0, visited=None, mode='products'):
+def fetch_page(url, conditional=False, market='target'):
     """
-    Crawl a page and extract products or site structure
-    mode: 'products' or 'structure'
+    Fetch a page once, returning the FetchedPage or None. Failures worth
+    retrying raise RetryLater; the crawler paces and retries them.
+    With conditional=True the ETag/Last-Modified stored for this market
+    are sent, so an unchanged page may come back as an empty 304.
     """
-    if visited is None:
-        visited = set()
-    
-    if depth > MAX_DEPTH or url in visited:
-        return
-    
-    visited.add(url)
-    print(f"\n[*] Analyzing page: {url}")
+    log.debug("Fetching %s", url)
     
     try:
         # Get random user agent
@@ -287,131 +138,287 @@ def crawl_page(url, depth=0, visited=None, mode='products'):
             'User-Agent': get_random_user_agent()
         }
         
-        # Setup proxy
-        proxies = setup_proxies(url)
-        if not proxies and ".onion" in url:
-            print(f"[!] Cannot access .onion site without Tor: {url}")
-            return
+        if conditional:
+            metadata = get_fetch_metadata(market, url)
+            if metadata and metadata['etag']:
+                headers['If-None-Match'] = metadata['etag']
+            if metadata and metadata['last_modified']:
+                headers['If-Modified-Since'] = metadata['last_modified']
         
-        # Make request with retries
-        for attempt in range(MAX_RETRIES):
-            try:
-                response = requests.get(
-                    url,
-                    proxies=proxies,
-                    headers=headers,
-                    timeout=TIMEOUT,
-                    verify=False  # Disable SSL verification
-                )
-                response.raise_for_status()
-                break
-            except requests.exceptions.SSLError:
-                print("[!] SSL Error - Retrying without verification...")
-                continue
-            except requests.exceptions.RequestException as e:
-                if attempt == MAX_RETRIES - 1:
-                    raise
-                print(f"[!] Attempt {attempt + 1} failed: {str(e)}")
-                time.sleep(REQUEST_DELAY)
-        
-        # Parse HTML
-        soup = BeautifulSoup(response.text, 'html.parser')
+        # Setup proxy
+        proxy_pool = setup_proxies(url)
+        if not proxy_pool and ".onion" in url:
+            log.warning("Cannot access .onion site without Tor: %s", url)
+            return None
+        endpoint = proxy_pool.acquire() if proxy_pool else None
+        proxies = endpoint.proxies if endpoint else None
         
-        if mode == 'products':
-            # Extract products
-            products = extract_products(response.text, url)
-            if products:
-                print(f"\n[+] Found {len(products)} products on {url}")
-                for product in products:
-                    add_or_update_product("target", product['title'], product['price'], product['url'])
-            else:
-                print(f"[!] No products found on {url}")
-        else:  # mode == 'structure'
-            # Extract site structure
-            page_info = {
-                'url': url,
-                'meta': extract_meta_info(soup),
-                'forms': extract_forms(soup, url),
-                'resources': extract_resources(soup, url),
-                'links': []
-            }
-            
-            # Extract links
-            links = extract_links(response.text, url)
-            if links:
-                print(f"[+] Found {len(links)} links on {url}")
-                for link in links:
-                    page_info['links'].append({
-                        'url': link,
-                        'text': soup.find('a', href=link).text.strip() if soup.find('a', href=link) else ''
-                    })
-            else:
-                print(f"[!] No links found on {url}")
-            
-            # Update site structure
-            site_structure['pages'].append(page_info)
+        started = time.perf_counter()
+        proxy_failed = False
+        try:
+            page = default_pool.fetch(
+                url,
+                proxies=proxies,
+                headers=headers,
+                timeout=TIMEOUT,
+                verify=False  # Disable SSL verification
+            )
+        except ResponseRejected as e:
+            FETCHES.inc(outcome='rejected')
+            log.warning("Skipping %s: %s", url, e)
+            return None
+        except requests.exceptions.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            if status in (429, 503):
+                # The server asks us to slow down; the crawler backs off this host
+                FETCHES.inc(outcome='throttled')
+                raise RetryLater(f"HTTP {status}", throttled=True,
+                                 retry_after=parse_retry_after(e.response.headers.get('Retry-After')))
+            FETCHES.inc(outcome='error')
+            if status is not None and status >= 500:
+                raise RetryLater(f"HTTP {status}")
+            log.warning("Skipping %s: %s", url, e)
+            return None
+        except requests.exceptions.RequestException as e:
+            FETCHES.inc(outcome='error')
+            if endpoint and isinstance(e, (requests.exceptions.ConnectionError,
+                                           requests.exceptions.Timeout)):
+                proxy_failed = True
+            raise RetryLater(str(e))
+        finally:
+            elapsed = time.perf_counter() - started
+            FETCH_SECONDS.observe(elapsed)
+            if endpoint:
+                proxy_pool.release(endpoint, elapsed, failed=proxy_failed)
+                if proxy_failed and proxy_pool.all_failing():
+                    # Every endpoint is failing; Tor itself may be down
+                    tor_health.invalidate()
         
-        # Follow links if not at max depth
-        if depth < MAX_DEPTH:
-            links = extract_links(response.text, url)
-            for link in links:
-                if link not in visited and not any(x in link for x in ['checkout', 'cart', 'login', 'register']):
-                    time.sleep(REQUEST_DELAY)
-                    crawl_page(link, depth + 1, visited, mode)
+        FETCHES.inc(outcome='not_modified' if page.status_code == 304 else 'ok')
+        FETCH_BYTES.observe(len(page.content))
+        return page
                     
     except requests.exceptions.RequestException as e:
-        print(f"[!] Error crawling {url}: {str(e)}")
-    except Exception as e:
-        print(f"[!] Unexpected error crawling {url}: {str(e)}")
+        log.error("Error crawling %s: %s", url, e, extra={'url': url})
+    return None
+
+def process_page(url, response, mode='products', market='target', stats=None,
+                 parser_name=None, parse_pool=None, sitemap=None):
+    """
+    Extract products or site structure from a fetched page
+    and return the links to follow.
+    Parsing runs in `parse_pool` (see pipeline.ParsePool); products come
+    from the market's parser when it finds any, from the generic
+    extract_products otherwise. In structure mode each page record is
+    written to `sitemap` (see sitemap.SiteMapWriter).
+    """
+    stats = stats or CrawlStats()
+    parse_pool = parse_pool or default_parse_pool
+    if mode == 'products':
+        # Skip parsing entirely when the page has not changed since last round
+        metadata = get_fetch_metadata(market, url)
+        body_hash = hashlib.sha256(response.content).hexdigest()
+        if metadata and (response.status_code == 304 or metadata['body_hash'] == body_hash):
+            log.debug("Page unchanged, skipping: %s", url)
+            product_writer.touch_page(market, url)
+            stats.count_page(unchanged=True)
+            PAGES.inc(mode=mode, result='unchanged')
+            return set(metadata['links'])
+    
+    # Relative links resolve against the URL the page was served from
+    page_url = getattr(response, 'url', None) or url
+    records = parse_pool.parse(page_url, response.content, response.encoding, mode, parser_name)
+    stats.count_page()
+    PAGES.inc(mode=mode, result='parsed')
+    PARSE_SECONDS.observe(records['timings']['parse'])
+    EXTRACT_SECONDS.observe(records['timings']['extract'])
+    
+    if mode == 'products':
+        products = records['products']
+        PRODUCTS_PER_PAGE.observe(len(products))
+        log.debug("Found %d products on %s", len(products), url)
+        # One batch per page; unchanged listings come from the classifier cache
+        labels = default_classifier.classify_many([product_text(p) for p in products])
+        for product, label in zip(products, labels):
+            product['label'], product['label_score'] = label['label'], label['score']
+        # The fingerprint commits with the products, so a page whose rows
+        # were never written is parsed again next round
+        product_writer.submit_page(market, url, products, response.headers.get('ETag'),
+                                   response.headers.get('Last-Modified'), body_hash,
+                                   records['links'])
+    else:  # mode == 'structure'
+        page_info = records['page_info']
+        log.debug("Found %d links on %s", len(page_info['links']), url)
+        if sitemap is not None:
+            sitemap.write(page_info)
+    
+    return set(records['links'])
+
+def crawl_id(mode, url):
+    """Key of a crawl's persisted frontier"""
+    return f"{mode}:{url}"
+
+def crawl_page(url, depth=0, visited=None, mode='products', market='target',
+               concurrency=MAX_CONCURRENCY, per_host=MAX_PER_HOST, sitemap=None):
+    """
+    Crawl a site starting from a page and extract products or site structure
+    mode: 'products' or 'structure'
+    Products are stored under `market`; page structure is written to `sitemap`.
+    """
+    if visited is None:
+        visited = make_visited()
+    
+    stats = CrawlStats()
+    parser_name = MARKETS.get(market, {}).get('parser')
+    
+    # Persisted frontier: an interrupted crawl of the same site resumes
+    frontier = Frontier(crawl_id(mode, url))
+    scope = CrawlScope(url)
+    
+    crawler = Crawler(
+        lambda page_url: fetch_page(page_url, conditional=(mode == 'products'), market=market),
+        lambda page_url, page_depth, response: process_page(
+            page_url, response, mode, market, stats, parser_name, sitemap=sitemap),
+        max_depth=MAX_DEPTH,
+        concurrency=concurrency,
+        per_host=per_host,
+        visited=visited,
+        max_pages=MAX_PAGES,
+        frontier=frontier,
+        scope=scope
+    )
+    try:
+        pages = crawler.crawl(url, depth)
+    finally:
+        product_writer.flush()
+        frontier.close()
+    
+    log.info("Round complete for %s: %d pages, %d unchanged and skipped",
+             market, stats.pages, stats.unchanged,
+             extra={'market': market, 'pages': stats.pages, 'unchanged': stats.unchanged})
+    if scope.rejected:
+        log.info("Out-of-scope links skipped: %s",
+                 ", ".join(f"{reason} {count}" for reason, count in scope.rejected.most_common()))
+    
+    pool_stats = default_pool.stats()
+    log.info("Connection pool: %d sessions, %.0f%% connection reuse, %.0f%% session hits",
+             pool_stats['sessions'], pool_stats['connection_reuse_rate'] * 100,
+             pool_stats['session_hit_rate'] * 100)
+    write_metrics()
+    return pages
+
+# Localhost scrape endpoint, started when METRICS_PORT is set
+metrics_server = None
+
+def start_metrics():
+    """Serve metrics on 127.0.0.1:METRICS_PORT if configured"""
+    global metrics_server
+    if METRICS_PORT and metrics_server is None:
+        metrics_server = MetricsServer(registry, METRICS_PORT).start()
+        log.info("Metrics available at %s", metrics_server.url)
+
+def write_metrics():
+    """Write the JSON metrics snapshot to METRICS_FILE if configured"""
+    if METRICS_FILE:
+        try:
+            registry.write_snapshot(METRICS_FILE)
+        except OSError as e:
+            log.warning("Could not write metrics to %s: %s", METRICS_FILE, e)
 
-def save_site_structure(structure, base_url):
-    """Save site structure to JSON file"""
-    filename = f"site_map_{urlparse(base_url).netloc}.json"
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(structure, f, indent=4, ensure_ascii=False)
-    print(f"[+] Site map saved to: {filename}")
+def shutdown():
+    """Flush pending writes and stop background workers"""
+    global metrics_server
+    product_writer.close()
+    default_parse_pool.close()
+    tor_health.stop()
+    write_metrics()
+    if metrics_server is not None:
+        metrics_server.stop()
+        metrics_server = None
 
-def monitor_products(target_url):
-    """Monitor products"""
+def monitor_products(target_url, rounds=0, interval=CHECK_INTERVAL, market='target'):
+    """Monitor products; rounds=0 keeps going until interrupted"""
     setup_db()
+    start_metrics()
     
     # Check Tor connection first
-    if ".onion" in target_url and not check_tor_connection():
-        print("[!] Cannot monitor .onion sites without Tor")
-        return
+    if ".onion" in target_url:
+        if not tor_health.is_up():
+            print("[!] Cannot monitor .onion sites without Tor")
+            return
+        tor_health.start()
     
-    print(f"[*] Using proxy: {setup_proxies(target_url)}")
+    print(f"[*] Using proxy: {setup_proxies(target_url) or 'none'}")
     
-    while True:
-        try:
-            print(f"\n[+] Checking site: {target_url}")
-            crawl_page(target_url, mode='products')
-            print(f"[*] Waiting {CHECK_INTERVAL} seconds before next round...")
-            time.sleep(CHECK_INTERVAL)
-        except KeyboardInterrupt:
-            print("\n[*] Stopping monitoring...")
-            break
-        except Exception as e:
-            print(f"[!] Error: {e}")
-            time.sleep(10)
+    completed = 0
+    try:
+        while not rounds or completed < rounds:
+            try:
+                print(f"\n[+] Checking site: {target_url}")
+                crawl_page(target_url, mode='products', market=market)
+                completed += 1
+                if rounds and completed >= rounds:
+                    break
+                print(f"[*] Waiting {interval} seconds before next round...")
+                time.sleep(interval)
+            except KeyboardInterrupt:
+                print("\n[*] Stopping monitoring...")
+                break
+            except Exception as e:
+                print(f"[!] Error: {e}")
+                time.sleep(10)
+    finally:
+        shutdown()
 
-def map_site(url):
-    """Map site structure"""
-    global visited_pages, site_structure
+def monitor_markets(names=None, rounds=0):
+    """
+    Monitor the markets in config.MARKETS concurrently, or only those in
+    `names`; rounds=0 keeps going until interrupted
+    """
+    setup_db()
+    start_metrics()
+    
+    markets = {name: market for name, market in MARKETS.items()
+               if not names or name in names}
+    if not markets:
+        print("[!] No matching markets configured")
+        return
     
+    if any(".onion" in market['url'] for market in markets.values()):
+        if not tor_health.is_up():
+            print("[!] Tor is not reachable; .onion markets will be retried each round")
+        tor_health.start()
+    
+    scheduler = MarketScheduler(crawl_page, markets, rounds=rounds)
+    try:
+        scheduler.run_forever()
+    finally:
+        shutdown()
+
+def map_site(url, compress=SITEMAP_COMPRESS):
+    """
+    Map site structure. Page records stream to site_map_<host>.jsonl
+    (.jsonl.gz with compress) as they are parsed, and the summary
+    site_map_<host>.json is built from that file afterwards. An
+    interrupted map resumes and appends to the records it already wrote.
+    """
     print(f"[*] Starting site mapping: {url}")
-    reset_crawler()
+    start_metrics()
+    records_path, summary_path = record_paths(f"site_map_{urlparse(url).netloc}", compress)
     
-    # Update basic site information
-    site_structure['url'] = url
+    frontier = Frontier(crawl_id('structure', url))
+    resuming = frontier.has_pending()
+    frontier.close()
     
-    # Start crawling
-    crawl_page(url, mode='structure')
+    with SiteMapWriter(records_path, append=resuming) as sitemap:
+        crawl_page(url, mode='structure', sitemap=sitemap)
     
     # Check results and save
-    if len(visited_pages) > 0:
-        save_site_structure(site_structure, url)
-        print(f"[+] Analyzed {len(visited_pages)} pages from {url}")
+    summary = build_summary(records_path, summary_path)
+    if summary['pages']:
+        print(f"[+] Page records saved to: {records_path}")
+        print(f"[+] Site map saved to: {summary_path}")
+        print(f"[+] Analyzed {summary['pages']} pages from {url}")
     else:
         print(f"[!] Failed to analyze site: {url}")
 
@@ -429,24 +436,31 @@ def select_mode():
     print("\n[*] Select crawling mode:")
     print("1. Monitor products and prices")
     print("2. Extract site structure")
+    print("3. Monitor all configured markets")
     while True:
         try:
             choice = int(input("> "))
-            if choice in [1, 2]:
-                return "products" if choice == 1 else "structure"
-            print("[!] Please choose 1 or 2")
+            if choice in [1, 2, 3]:
+                return {1: "products", 2: "structure", 3: "markets"}[choice]
+            print("[!] Please choose 1, 2 or 3")
         except ValueError:
             print("[!] Please enter a valid number")
 
 def main():
+    setup_logging()
     print_banner()
     
-    # Get target URL
-    target_url = get_target_url()
-    
     # Select crawling mode
     mode = select_mode()
     
+    if mode == "markets":
+        print(f"\n[*] Starting monitoring of {len(MARKETS)} configured markets")
+        monitor_markets()
+        return
+    
+    # Get target URL
+    target_url = get_target_url()
+    
     if mode == "products":
         print(f"\n[*] Starting product monitoring for: {target_url}")
         monitor_products(target_url)
@@ -0,0 +1,90 @@
+import threading
+import time
+from config import MARKETS, CHECK_INTERVAL, MAX_CONCURRENCY, MAX_PER_HOST
+from db import update_market_status
+
+class MarketScheduler:
+    """
+    Monitors every configured market concurrently.
+
+    Each market runs its own loop in a thread: crawl, record the round's
+    result with update_market_status, then wait for its interval. A market
+    entry may override 'interval', 'concurrency' and 'per_host'; the
+    global CHECK_INTERVAL, MAX_CONCURRENCY and MAX_PER_HOST apply
+    otherwise.
+
+    crawl(url, market=..., concurrency=..., per_host=...) must return the
+    number of pages crawled. With rounds > 0 each market stops after that
+    many rounds.
+    """
+
+    def __init__(self, crawl, markets=MARKETS, rounds=0):
+        self.crawl = crawl
+        self.markets = markets
+        self.rounds = rounds
+        self._stop = threading.Event()
+        self._threads = []
+        self.error_counts = {name: 0 for name in markets}
+
+    def run_round(self, name, market):
+        """Crawl one market once and record the outcome"""
+        try:
+            pages = self.crawl(
+                market['url'],
+                market=name,
+                concurrency=market.get('concurrency', MAX_CONCURRENCY),
+                per_host=market.get('per_host', MAX_PER_HOST)
+            )
+            if not pages:
+                raise RuntimeError("no pages could be crawled")
+            self.error_counts[name] = 0
+            update_market_status(name, 'online', 0, market['url'])
+            print(f"[+] Market {name}: {pages} pages crawled")
+            return True
+        except Exception as e:
+            self.error_counts[name] += 1
+            update_market_status(name, 'error', self.error_counts[name], market['url'])
+            print(f"[!] Market {name} round failed: {str(e)}")
+            return False
+
+    def _loop(self, name, market):
+        interval = market.get('interval', CHECK_INTERVAL)
+        completed = 0
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self.run_round(name, market)
+            completed += 1
+            if self.rounds and completed >= self.rounds:
+                break
+            # Wait out the rest of the interval, waking early on stop()
+            self._stop.wait(max(0, interval - (time.monotonic() - started)))
+
+    def start(self):
+        """Start one monitoring thread per market"""
+        self._stop.clear()
+        for name, market in self.markets.items():
+            thread = threading.Thread(target=self._loop, args=(name, market),
+                                      name=f"market-{name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"[*] Monitoring {len(self._threads)} markets")
+
+    def stop(self):
+        """Ask every market loop to stop after its current round"""
+        self._stop.set()
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def run_forever(self):
+        """Start all markets and block until they finish or are interrupted"""
+        self.start()
+        try:
+            while any(thread.is_alive() for thread in self._threads):
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print("\n[*] Stopping market monitoring...")
+            self.stop()
+            self.join()
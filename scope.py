@@ -0,0 +1,112 @@
+import re
+from collections import Counter, defaultdict
+from urllib.parse import urlsplit
+from config import (
+    SCOPE_MODE, SCOPE_ALLOW, SCOPE_DENY, SCOPE_PATH_CAPS,
+    TRAP_MAX_QUERY_VARIANTS, TRAP_MAX_PATH_DEPTH, TRAP_MAX_REPEATED_SEGMENT
+)
+
+# Second-level suffixes under which a registrable domain has three labels
+TWO_LEVEL_SUFFIXES = {
+    'co.uk', 'org.uk', 'ac.uk', 'gov.uk', 'com.au', 'net.au', 'org.au',
+    'co.jp', 'co.nz', 'com.br', 'com.cn', 'com.tr', 'co.in', 'co.za'
+}
+
+def registrable_domain(host):
+    """
+    Approximate the registrable domain of a host: the last two labels,
+    or three under a known two-level suffix. 'a.b.xyz.onion' -> 'xyz.onion'.
+    """
+    labels = host.lower().rstrip('.').split('.')
+    if len(labels) >= 3 and '.'.join(labels[-2:]) in TWO_LEVEL_SUFFIXES:
+        return '.'.join(labels[-3:])
+    return '.'.join(labels[-2:])
+
+class CrawlScope:
+    """
+    Decides which discovered links the crawler may follow.
+
+    Links must stay on the root's host ('same-host') or registrable domain
+    ('same-domain'), match the allow list if one is set, match none of the
+    deny patterns, stay under the page cap of any path pattern they match
+    and not look like a URL-space trap: too many query variants of one
+    path, very deep paths, or a path segment repeated over and over.
+
+    allows() only checks a link; record() counts it against the caps and
+    is called once per page actually queued, so a link seen on many pages
+    uses up one slot.
+    """
+
+    def __init__(self, root_url, mode=SCOPE_MODE, allow=SCOPE_ALLOW, deny=SCOPE_DENY,
+                 path_caps=SCOPE_PATH_CAPS, max_query_variants=TRAP_MAX_QUERY_VARIANTS,
+                 max_path_depth=TRAP_MAX_PATH_DEPTH,
+                 max_repeated_segment=TRAP_MAX_REPEATED_SEGMENT):
+        if mode not in ('same-host', 'same-domain', 'any'):
+            raise ValueError(f"Invalid scope mode: {mode}")
+        self.mode = mode
+        self.root_host = (urlsplit(root_url).hostname or '').lower()
+        self.root_domain = registrable_domain(self.root_host)
+        self.allow = [re.compile(pattern) for pattern in allow]
+        self.deny = re.compile('|'.join(f'(?:{p})' for p in deny)) if deny else None
+        self.path_caps = [(re.compile(pattern), cap) for pattern, cap in path_caps.items()]
+        self.max_query_variants = max_query_variants
+        self.max_path_depth = max_path_depth
+        self.max_repeated_segment = max_repeated_segment
+        self._path_counts = Counter()
+        self._query_variants = defaultdict(set)
+        self.rejected = Counter()
+
+    def _reject(self, reason):
+        self.rejected[reason] += 1
+        return False
+
+    def _in_site(self, host):
+        if self.mode == 'same-host':
+            return host == self.root_host
+        if self.mode == 'same-domain':
+            return registrable_domain(host) == self.root_domain
+        return True
+
+    def _is_trap(self, parts):
+        segments = [s for s in parts.path.split('/') if s]
+        if self.max_path_depth and len(segments) > self.max_path_depth:
+            return True
+        if self.max_repeated_segment and segments:
+            if Counter(segments).most_common(1)[0][1] > self.max_repeated_segment:
+                return True
+        if self.max_query_variants and parts.query:
+            variants = self._query_variants.get((parts.hostname, parts.path), ())
+            if parts.query not in variants and len(variants) >= self.max_query_variants:
+                return True
+        return False
+
+    def allows(self, url):
+        """Return True if the link is in scope; only rejections are counted"""
+        try:
+            parts = urlsplit(url)
+            host = (parts.hostname or '').lower()
+        except ValueError:
+            return self._reject('invalid')
+
+        if not self._in_site(host):
+            return self._reject('off-site')
+        if self.allow and not any(pattern.search(url) for pattern in self.allow):
+            return self._reject('not-allowed')
+        if self.deny and self.deny.search(url):
+            return self._reject('denied')
+        if self._is_trap(parts):
+            return self._reject('trap')
+
+        if any(self._path_counts[pattern.pattern] >= cap for pattern, cap in self.path_caps
+               if pattern.search(parts.path)):
+            return self._reject('path-cap')
+        return True
+
+    def record(self, url):
+        """Count a queued link against the path caps and query variants"""
+        parts = urlsplit(url)
+        for pattern, _ in self.path_caps:
+            if pattern.search(parts.path):
+                self._path_counts[pattern.pattern] += 1
+        if self.max_query_variants and parts.query:
+            self._query_variants[(parts.hostname, parts.path)].add(parts.query)
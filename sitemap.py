@@ -0,0 +1,124 @@
+import gzip
+import json
+import os
+import threading
+from urlnorm import FingerprintSet, canonicalize
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    # Line buffered, so every finished record reaches the file
+    return open(path, mode, encoding='utf-8', buffering=1)
+
+def record_paths(base_name, compress=False):
+    """Return (records path, summary path) for a site map base name"""
+    records = f"{base_name}.jsonl" + ('.gz' if compress else '')
+    return records, f"{base_name}.json"
+
+class SiteMapWriter:
+    """
+    Append page records to a JSON Lines file as they are produced, so
+    memory does not grow with the site and an interrupted map keeps
+    every page written so far. Paths ending in .gz are gzip-compressed.
+    Safe to call from several crawl threads.
+    """
+
+    def __init__(self, path, append=False):
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+        self._file = _open(path, 'a' if append else 'w')
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def iter_records(path):
+    """
+    Yield the page records of a site map one at a time. A truncated last
+    line or gzip stream, as left by a crash, ends the iteration quietly.
+    """
+    with _open(path, 'r') as f:
+        try:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    return
+        except EOFError:
+            return
+
+def build_summary(records_path, summary_path=None):
+    """
+    Build the site summary from a records file in one streaming pass.
+    Pages, links and resources are counted in fingerprint sets, so
+    memory stays at a few bytes per distinct URL. Pages recorded twice
+    (e.g. refetched after a resume) are counted once. Returns the
+    summary and writes it to `summary_path` when given.
+    """
+    pages = FingerprintSet()
+    links = FingerprintSet()
+    resources = {'images': FingerprintSet(), 'scripts': FingerprintSet(),
+                 'styles': FingerprintSet()}
+    forms = {}
+    summary = {'url': '', 'title': '', 'description': '', 'meta': {}}
+    link_count = 0
+
+    for record in iter_records(records_path):
+        page = canonicalize(record['url'])
+        if page in pages:
+            continue
+        pages.add(page)
+        if not summary['url']:
+            # The start page is always recorded first
+            summary['url'] = record['url']
+            summary['meta'] = record.get('meta', {})
+            summary['title'] = summary['meta'].get('title', '')
+            summary['description'] = summary['meta'].get('description', '')
+
+        for link in record.get('links', []):
+            link_count += 1
+            links.add(canonicalize(link['url']))
+        page_resources = record.get('resources', {})
+        for image in page_resources.get('images', []):
+            resources['images'].add(image['url'])
+        for kind in ('scripts', 'styles'):
+            for url in page_resources.get(kind, []):
+                resources[kind].add(url)
+        for form in record.get('forms', []):
+            key = (form['action'], form['method'].lower())
+            entry = forms.setdefault(key, {
+                'action': form['action'],
+                'method': form['method'].lower(),
+                'inputs': sorted({i['name'] for i in form['inputs'] if i['name']}),
+                'pages': 0
+            })
+            entry['pages'] += 1
+
+    summary.update({
+        'records': os.path.basename(records_path),
+        'pages': len(pages),
+        'links': link_count,
+        'unique_links': len(links),
+        'images': len(resources['images']),
+        'scripts': len(resources['scripts']),
+        'styles': len(resources['styles']),
+        'forms': list(forms.values())
+    })
+
+    if summary_path:
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=4, ensure_ascii=False)
+    return summary
@@ -0,0 +1,30 @@
+"""
+Shared test setup: the lazy config points at a throwaway directory before
+any SayerDark module reads it, so tests never touch products.db or the
+network. Pacing and backoff are fast so crawls finish in milliseconds.
+"""
+import json
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import config
+
+WORKDIR = tempfile.mkdtemp(prefix='sayerdark-tests-')
+CONFIG_FILE = os.path.join(WORKDIR, 'config.json')
+with open(CONFIG_FILE, 'w') as f:
+    json.dump({
+        'DATABASE_FILE': os.path.join(WORKDIR, 'test.db'),
+        'BACKUP_DIR': os.path.join(WORKDIR, 'backups'),
+        'LOG_FILE': '',
+        'REQUEST_DELAY': 0,
+        'RATE_MAX': 1000,
+        'BACKOFF_BASE': 0.01,
+        'BACKOFF_MAX': 0.05,
+        'PARSE_WORKERS': 1
+    }, f)
+config.use_config_file(CONFIG_FILE)
@@ -0,0 +1,132 @@
+import asyncio
+import re
+import threading
+import time
+import pytest
+from crawler import Crawler
+from ratelimit import RateLimiter, RetryLater
+from http_pool import SessionPool
+from scope import CrawlScope
+from synthetic_market import build_site, SiteServer
+
+HOST = 'http://market.onion'
+
+class FakeSite:
+    """Every page links to `links` new pages on the same host"""
+
+    def __init__(self, links=5, latency=0.01, failures=None):
+        self.links = links
+        self.latency = latency
+        self.failures = dict(failures or {})
+        self.fetched = []
+        self.lock = threading.Lock()
+
+    def fetch(self, url):
+        time.sleep(self.latency)
+        with self.lock:
+            self.fetched.append(url)
+            if self.failures.get(url, 0) > 0:
+                self.failures[url] -= 1
+                raise RetryLater('HTTP 503', throttled=True)
+        return url
+
+    def handle(self, url, depth, response):
+        page = url.rsplit('/', 1)[-1]
+        return [f"{HOST}/{page}-{k}" for k in range(self.links)]
+
+def crawl(crawler, start=f"{HOST}/p", timeout=10):
+    return asyncio.run(asyncio.wait_for(crawler.run(start), timeout))
+
+def fast_limiter(rate=1000, burst=100):
+    return RateLimiter(initial_rate=rate, max_rate=rate, burst=burst)
+
+def test_stops_at_page_budget_with_parked_urls():
+    site = FakeSite(links=10)
+    crawler = Crawler(site.fetch, site.handle, max_depth=5, concurrency=8, per_host=4,
+                      max_pages=100, limiter=fast_limiter())
+    assert crawl(crawler) == 100
+    assert len(site.fetched) == 100
+    assert not any(crawler._parked.values())
+
+def test_stops_at_page_budget_with_urls_waiting_for_tokens():
+    site = FakeSite(links=10, latency=0)
+    crawler = Crawler(site.fetch, site.handle, max_depth=5, concurrency=8, per_host=4,
+                      max_pages=30, limiter=fast_limiter(rate=200, burst=1))
+    assert crawl(crawler) == 30
+    assert not crawler._timers
+
+def test_per_host_limit():
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def fetch(url):
+        with lock:
+            active.append(url)
+            peak.append(len(active))
+        time.sleep(0.01)
+        with lock:
+            active.remove(url)
+        return url
+
+    site = FakeSite(links=4)
+    crawler = Crawler(fetch, site.handle, max_depth=3, concurrency=8, per_host=2,
+                      max_pages=40, limiter=fast_limiter())
+    assert crawl(crawler) == 40
+    assert max(peak) <= 2
+
+def test_retries_then_succeeds():
+    site = FakeSite(links=0, failures={f"{HOST}/p": 2})
+    crawler = Crawler(site.fetch, site.handle, max_retries=3, limiter=fast_limiter())
+    assert crawl(crawler) == 1
+    assert site.fetched == [f"{HOST}/p"] * 3
+    assert not crawler._attempts
+
+def test_gives_up_after_max_retries():
+    site = FakeSite(links=0, failures={f"{HOST}/p": 5})
+    crawler = Crawler(site.fetch, site.handle, max_retries=2, limiter=fast_limiter())
+    assert crawl(crawler) == 0
+    assert len(site.fetched) == 2
+
+def test_throttling_slows_the_host():
+    limiter = fast_limiter(rate=100)
+    site = FakeSite(links=0, failures={f"{HOST}/p": 1})
+    crawl(Crawler(site.fetch, site.handle, limiter=limiter))
+    assert limiter.stats()['market.onion']['rate'] < 100
+
+def test_path_cap_counts_pages_not_sightings():
+    links = {
+        '/p': ['/list/a', '/list/b', '/list/c'],
+        '/list/a': ['/item/1', '/item/2'],
+        '/list/b': ['/item/1', '/item/2'],
+        '/list/c': ['/item/1', '/item/2', '/item/3', '/item/4'],
+    }
+    fetched = []
+
+    def fetch(url):
+        fetched.append(url)
+        return url
+
+    def handle(url, depth, response):
+        return [HOST + path for path in links.get(url[len(HOST):], ())]
+
+    scope = CrawlScope(HOST, path_caps={r'^/item/': 3})
+    crawler = Crawler(fetch, handle, max_depth=5, concurrency=1, scope=scope,
+                      limiter=fast_limiter())
+    crawl(crawler)
+    items = sorted(url[len(HOST):] for url in fetched if '/item/' in url)
+    assert items == ['/item/1', '/item/2', '/item/3']
+    assert scope.rejected == {'path-cap': 1}
+
+@pytest.mark.parametrize('per_host', [1, 4])
+def test_crawls_synthetic_market(per_host):
+    site = build_site(pages=60, fanout=5)
+    pool = SessionPool()
+    with SiteServer(site) as server:
+        def handle(url, depth, page):
+            return [server.url + href for href in re.findall(r'href="(/page/\d+)"', page.text)]
+        crawler = Crawler(lambda url: pool.fetch(url, timeout=5), handle, max_depth=10,
+                          concurrency=8, per_host=per_host, max_pages=25,
+                          limiter=fast_limiter())
+        assert crawl(crawler, f"{server.url}/page/0") == 25
+    pool.close()
@@ -0,0 +1,120 @@
+import random
+import pytest
+import db
+
+PAGE = 'http://m.onion/listings'
+
+@pytest.fixture(scope='module', autouse=True)
+def database():
+    db.setup_db()
+
+@pytest.fixture
+def writer():
+    writer = db.ProductWriter()
+    yield writer
+    writer.close()
+
+def age(market, days):
+    conn = db.get_connection()
+    with conn:
+        conn.execute("UPDATE products SET last_seen = datetime('now', ?) WHERE market = ?",
+                     (f'-{days} days', market))
+
+def test_unchanged_page_touches_products_with_their_own_url(writer):
+    products = [{'title': 'Widget', 'price': '$5', 'url': 'http://m.onion/item/1'}]
+    writer.submit_page('touch', PAGE, products, body_hash='abc', links=[])
+    writer.flush()
+    age('touch', 2)
+    assert db.get_market_stats('touch') == (1, 0, 0)
+
+    writer.touch_page('touch', PAGE)
+    writer.flush()
+    assert db.get_market_stats('touch') == (1, 1, 0)
+
+def test_fingerprint_commits_with_products(writer):
+    writer.submit_page('fingerprint', PAGE, [{'title': 'Widget', 'price': '$5'}],
+                       etag='"v1"', body_hash='abc', links=['http://m.onion/a'])
+    writer.flush()
+    metadata = db.get_fetch_metadata('fingerprint', PAGE)
+    assert metadata['body_hash'] == 'abc'
+    assert metadata['links'] == ['http://m.onion/a']
+
+def test_failed_batch_leaves_no_fingerprint(writer):
+    # A value sqlite cannot bind fails the whole transaction
+    writer.submit_page('failed', PAGE, [{'title': 'Widget', 'price': '$5', 'url': object()}],
+                       body_hash='abc')
+    writer.flush()
+    assert db.get_fetch_metadata('failed', PAGE) is None
+    assert db.get_market_stats('failed') == (0, 0, 0)
+
+class RecordingWriter(db.ProductWriter):
+    """Records the number of product rows in each transaction"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.transactions = []
+
+    def _write(self, conn, entries):
+        self.transactions.append(sum(len(rows) for rows, _, _ in entries))
+        super()._write(conn, entries)
+
+def test_batches_are_bounded_by_rows():
+    writer = RecordingWriter(batch_size=3)
+    try:
+        for page in range(4):
+            products = [{'title': f"item {page}-{i}", 'price': '$5'} for i in range(7)]
+            writer.submit_page('rows', f"{PAGE}/{page}", products, body_hash='abc')
+        writer.touch_page('rows', f"{PAGE}/0")
+        writer.flush()
+    finally:
+        writer.close()
+    assert max(writer.transactions) <= 3
+    assert writer.written == 28
+    assert db.get_market_stats('rows')[0] == 28
+    for page in range(4):
+        assert db.get_fetch_metadata('rows', f"{PAGE}/{page}")['body_hash'] == 'abc'
+
+def summary_tables():
+    conn = db.get_connection()
+    return (conn.execute('SELECT * FROM market_summary ORDER BY market').fetchall(),
+            conn.execute('SELECT * FROM market_activity ORDER BY market, hour').fetchall())
+
+def scanned_stats(market):
+    """The stats computed by scanning products, as before market_summary"""
+    conn = db.get_connection()
+    total, active = conn.execute('''
+        SELECT COUNT(*), COALESCE(SUM(last_seen >= datetime('now', '-1 day')), 0)
+        FROM products WHERE market = ?
+    ''', (market,)).fetchone()
+    changed = conn.execute('''
+        SELECT COUNT(*) FROM (
+            SELECT o.product_id FROM price_observations o
+            JOIN products p ON p.id = o.product_id
+            WHERE p.market = ? GROUP BY o.product_id HAVING COUNT(*) > 1
+        )
+    ''', (market,)).fetchone()[0]
+    return total, active, changed
+
+def test_market_summary_matches_a_full_rebuild(writer):
+    rng = random.Random(7)
+    markets = ['summary-a', 'summary-b']
+    for round_number in range(4):
+        for _ in range(200):
+            market = rng.choice(markets)
+            price = f"${rng.choice([5, 5, 5, 6, 7])}"
+            if rng.random() < 0.5:
+                db.add_or_update_product(market, f"item {rng.randrange(60)}", price)
+            else:
+                writer.submit(market, f"item {rng.randrange(60)}", price)
+        writer.flush()
+        if round_number == 1:
+            # Old sightings move to another hour bucket and out of the active count
+            age('summary-a', 2)
+
+    maintained = summary_tables()
+    conn = db.get_connection()
+    with conn:
+        db.rebuild_market_summary()
+    assert summary_tables() == maintained
+    for market in markets:
+        assert db.get_market_stats(market) == scanned_stats(market)
@@ -0,0 +1,30 @@
+import pytest
+from extractors import extract_products
+from product_matcher import ProductMatcher
+from synthetic_market import build_site
+
+URL = 'http://m.onion/listings'
+
+def matcher(nesting):
+    return ProductMatcher(['div.product', 'div.item'], ['span.price'], nesting=nesting)
+
+@pytest.mark.parametrize('nesting', ['innermost', 'outermost'])
+def test_outer_container_kept_when_nested_candidate_has_no_product(nesting):
+    html = ('<div class="product"><h3>Widget</h3><span class="price">$5</span>'
+            '<div class="item">Ships worldwide</div></div>')
+    products = extract_products(html, URL, matcher(nesting))
+    assert [(p['title'], p['price']) for p in products] == [('Widget', '$5')]
+
+def test_innermost_picks_nested_product():
+    html = ('<div class="product"><h2>Shop</h2>'
+            '<div class="item"><h3>A</h3><span class="price">$1</span></div>'
+            '<div class="item"><h3>B</h3><span class="price">$2</span></div></div>')
+    assert [p['title'] for p in extract_products(html, URL, matcher('innermost'))] == ['A', 'B']
+    assert [p['title'] for p in extract_products(html, URL, matcher('outermost'))] == ['Shop']
+
+@pytest.mark.parametrize('nesting', [1, 3])
+def test_synthetic_listings_found_once(nesting):
+    html = build_site(pages=1, listings=12, nesting=nesting)['/page/0']
+    products = extract_products(html, URL)
+    assert len(products) == 12
+    assert products[0]['title'] == 'Listing 0-0'
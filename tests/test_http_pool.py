@@ -0,0 +1,99 @@
+import threading
+import time
+import pytest
+from http_pool import SessionPool, ResponseRejected
+from synthetic_market import build_site, SiteServer
+from socks_standin import SocksStandin
+
+@pytest.fixture(scope='module')
+def server():
+    with SiteServer(build_site(pages=5, listings=50)) as server:
+        yield server
+
+def test_sessions_and_connections_are_reused(server):
+    pool = SessionPool()
+    for page in range(5):
+        assert pool.fetch(f"{server.url}/page/{page}", timeout=5).status_code == 200
+    stats = pool.stats()
+    assert stats['sessions'] == 1
+    assert stats['session_hits'] == 4
+    assert stats['new_connections'] == 1
+    pool.close()
+
+def test_sessions_are_keyed_by_proxy(server):
+    pool = SessionPool()
+    with SocksStandin() as proxy:
+        proxies = {'http': proxy.url, 'https': proxy.url}
+        pool.fetch(f"{server.url}/page/0", timeout=5)
+        page = pool.fetch(f"{server.url}/page/1", proxies=proxies, timeout=5)
+        assert b'Market page 1' in page.content
+    assert pool.stats()['sessions'] == 2
+    pool.close()
+
+def test_idle_sessions_are_evicted(server):
+    pool = SessionPool(idle_timeout=0.05)
+    pool.fetch(f"{server.url}/page/0", timeout=5)
+    time.sleep(0.1)
+    pool.evict_idle()
+    assert pool.stats()['sessions'] == 0
+    assert pool.evictions == 1
+
+def test_session_in_use_is_not_evicted(server):
+    pool = SessionPool(idle_timeout=0.05)
+    with pool._checkout(f"{server.url}/page/0", None):
+        time.sleep(0.1)
+        pool.session_for('http://other.onion/')
+        assert pool.evictions == 0
+    time.sleep(0.1)
+    pool.evict_idle()
+    assert pool.evictions == 2
+
+def test_slow_download_survives_other_lookups(server):
+    pool = SessionPool(idle_timeout=0.05)
+    result = {}
+    # ~18 KB at 30 KB/s keeps the download running well past the idle timeout
+    with SocksStandin(bandwidth=30000) as proxy:
+        proxies = {'http': proxy.url, 'https': proxy.url}
+
+        def slow():
+            result['page'] = pool.fetch(f"{server.url}/page/0", proxies=proxies, timeout=10)
+
+        thread = threading.Thread(target=slow)
+        thread.start()
+        while thread.is_alive():
+            pool.session_for('http://other.onion/')
+            time.sleep(0.02)
+        thread.join()
+    assert result['page'].status_code == 200
+    assert len(result['page'].content) > 10000
+    # The proxied session was in use the whole time, so it is still pooled
+    assert pool.evictions == 0
+    assert pool.stats()['sessions'] == 2
+    pool.close()
+
+def test_concurrency_past_maxsize_reuses_pooled_connections(server):
+    pool = SessionPool(maxsize=2)
+    pages = []
+    # Throttled so the six downloads overlap
+    with SocksStandin(bandwidth=200000) as proxy:
+        proxies = {'http': proxy.url, 'https': proxy.url}
+
+        def fetch():
+            pages.append(pool.fetch(f"{server.url}/page/0", proxies=proxies, timeout=10))
+
+        threads = [threading.Thread(target=fetch) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert [page.status_code for page in pages] == [200] * 6
+    stats = pool.stats()
+    assert stats['requests'] == 6
+    assert stats['new_connections'] == 2
+    pool.close()
+
+def test_oversized_body_is_rejected(server):
+    pool = SessionPool()
+    with pytest.raises(ResponseRejected):
+        pool.fetch(f"{server.url}/page/0", max_bytes=1000, timeout=5)
+    pool.close()
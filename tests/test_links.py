@@ -0,0 +1,59 @@
+import asyncio
+from crawler import Crawler
+from extractors import extract_links
+from pipeline import parse_page, ParsePool
+from ratelimit import RateLimiter
+from urlnorm import canonicalize
+import sayerdark
+
+PAGE = b'''<html><body>
+<a href="item1">Item 1</a>
+<a href="/search?flag">Flagged</a>
+<a href="item1#reviews">Item 1 reviews</a>
+<a href="/shop/?utm_source=x">Shop</a>
+<a href="/shop/">Shop again</a>
+</body></html>'''
+
+class Page:
+    def __init__(self, url, content=PAGE):
+        self.url = url
+        self.content = content
+        self.encoding = 'utf-8'
+        self.status_code = 200
+        self.headers = {}
+
+def test_relative_links_resolve_against_directory_url():
+    links = parse_page('http://m.onion/category/drugs/', PAGE, mode='structure')['links']
+    assert 'http://m.onion/category/drugs/item1' in links
+    assert 'http://m.onion/category/item1' not in links
+
+def test_links_are_fetched_as_written():
+    links = extract_links(PAGE, 'http://m.onion/category/drugs/')
+    assert 'http://m.onion/search?flag' in links
+    assert 'http://m.onion/category/drugs/item1' in links
+    # One link per page: the fragment and tracking variants collapse
+    assert len(links) == 3
+
+def test_canonical_form_is_only_a_key():
+    assert canonicalize('http://m.onion/shop/?utm_source=x') == canonicalize('http://m.onion/shop/')
+
+def test_process_page_uses_final_url_after_redirect():
+    response = Page('http://m.onion/category/drugs/')
+    links = sayerdark.process_page('http://m.onion/category/drugs', response, mode='structure',
+                                   parse_pool=ParsePool(workers=0))
+    assert 'http://m.onion/category/drugs/item1' in links
+
+def test_crawler_fetches_variants_once():
+    fetched = []
+
+    def fetch(url):
+        fetched.append(url)
+        return url
+
+    def handle(url, depth, response):
+        return ['http://m.onion/a/', 'http://m.onion/a/?utm_source=x', 'http://m.onion/a/#top']
+
+    crawler = Crawler(fetch, handle, max_depth=2,
+                      limiter=RateLimiter(initial_rate=1000, max_rate=1000, burst=100))
+    asyncio.run(crawler.run('http://m.onion/'))
+    assert fetched == ['http://m.onion/', 'http://m.onion/a/']
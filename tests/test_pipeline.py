@@ -0,0 +1,48 @@
+import json
+import multiprocessing
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+import config
+import document
+import product_matcher
+from pipeline import ParsePool, _init_worker
+from urlnorm import canonicalize
+from synthetic_market import build_site
+
+PAGE = build_site(pages=2, listings=3)['/page/0'].encode('utf-8')
+
+def test_parse_in_process():
+    records = ParsePool(workers=0).parse('http://m.onion/page/0', PAGE)
+    assert len(records['products']) == 3
+    assert 'http://m.onion/page/1' in records['links']
+
+def test_pool_recovers_from_dead_worker():
+    pool = ParsePool(workers=1)
+    try:
+        assert len(pool.parse('http://m.onion/page/0', PAGE)['products']) == 3
+        for pid in list(pool._executor._processes):
+            os.kill(pid, signal.SIGKILL)
+        assert len(pool.parse('http://m.onion/page/0', PAGE)['products']) == 3
+        assert len(pool.parse('http://m.onion/page/0', PAGE)['products']) == 3
+    finally:
+        pool.close()
+
+def _worker_settings():
+    return {'nesting': product_matcher.default_matcher.nesting,
+            'builder': document.ParsedDocument('<p>').builder,
+            'canonical': canonicalize('http://m.onion/a/'),
+            'database': config.DATABASE_FILE}
+
+def test_spawned_workers_use_parent_config_file(tmp_path):
+    settings = dict(config.get_config(), PRODUCT_NESTING='outermost', PARSER_BACKEND='html',
+                    CANONICAL_STRIP_TRAILING_SLASH=False)
+    config_file = tmp_path / 'worker.json'
+    config_file.write_text(json.dumps(settings))
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker,
+                             initargs=(str(config_file), ())) as executor:
+        worker = executor.submit(_worker_settings).result()
+    assert worker == {'nesting': 'outermost', 'builder': 'html',
+                      'canonical': 'http://m.onion/a/',
+                      'database': settings['DATABASE_FILE']}
@@ -0,0 +1,27 @@
+import pytest
+from prices import parse_price
+
+@pytest.mark.parametrize('text, expected', [
+    ('$1,200', (1200.0, 'USD')),
+    ('$5', (5.0, 'USD')),
+    ('0.05 BTC', (0.05, 'BTC')),
+    ('1.200,50 €', (1200.5, 'EUR')),
+    ('1,200.50 USD', (1200.5, 'USD')),
+    ('1 200 monero', (1200.0, 'XMR')),
+    ('1.234.567', (1234567.0, None)),
+    ('12,5 xmr', (12.5, 'XMR')),
+    ('£10 - £20', (10.0, 'GBP')),
+    ('Price: 0.5 eth', (0.5, 'ETH')),
+    ('Ξ 2', (2.0, 'ETH')),
+    ('ask seller', (None, None)),
+    ('', (None, None)),
+    (None, (None, None)),
+    (42, (42.0, None)),
+    (3.5, (3.5, None)),
+])
+def test_parse_price(text, expected):
+    assert parse_price(text) == expected
+
+def test_currency_words_must_be_whole():
+    # 'usd' inside a longer word is not a currency
+    assert parse_price('99 usdollars')[1] is None
@@ -0,0 +1,111 @@
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import requests
+from http_pool import SessionPool
+from proxy_pool import ProxyPool, proxy_endpoints
+from synthetic_market import build_site, SiteServer
+from socks_standin import SocksStandin
+
+@pytest.fixture(scope='module')
+def server():
+    with SiteServer(build_site(pages=40, listings=20)) as server:
+        yield server
+
+def dead_proxy():
+    """A SOCKS URL nobody listens on"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    return f"socks5h://127.0.0.1:{port}"
+
+def crawl(pool, server, pages=40, workers=8):
+    """Fetch the market's pages as a .onion site through the proxy pool"""
+    sessions = SessionPool()
+    onion = server.url.replace('127.0.0.1', 'market.onion')
+
+    def fetch(page):
+        endpoint = pool.acquire()
+        failed = False
+        try:
+            return sessions.fetch(f"{onion}/page/{page}", proxies=endpoint.proxies, timeout=5)
+        except requests.exceptions.ConnectionError:
+            failed = True
+        finally:
+            pool.release(endpoint, 0.01, failed=failed)
+
+    with ThreadPoolExecutor(workers) as executor:
+        results = list(executor.map(fetch, range(pages)))
+    sessions.close()
+    return results
+
+def test_endpoints_from_config():
+    primary = {'http': 'socks5h://127.0.0.1:9050', 'https': 'socks5h://127.0.0.1:9050'}
+    endpoints = proxy_endpoints(primary, ['socks5h://127.0.0.1:9052', primary], 2)
+    assert [e['http'] for e in endpoints] == [
+        'socks5h://sayerdark-0:x@127.0.0.1:9050', 'socks5h://sayerdark-1:x@127.0.0.1:9050',
+        'socks5h://sayerdark-0:x@127.0.0.1:9052', 'socks5h://sayerdark-1:x@127.0.0.1:9052']
+    # Names never show the password
+    assert str(ProxyPool(endpoints)).startswith('sayerdark-0@127.0.0.1:9050')
+
+def test_least_outstanding_spreads_load(server):
+    with SocksStandin() as a, SocksStandin() as b, SocksStandin() as c:
+        pool = ProxyPool([proxy_endpoints(p.url, [], 0)[0] for p in (a, b, c)])
+        results = crawl(pool, server)
+    assert all(r is not None and r.status_code == 200 for r in results)
+    requests_made = [s['requests'] for s in pool.stats().values()]
+    assert sum(requests_made) == 40
+    assert min(requests_made) >= 8
+
+def test_failing_endpoint_is_taken_out_of_rotation(server):
+    with SocksStandin() as a, SocksStandin() as b:
+        pool = ProxyPool([proxy_endpoints(url, [], 0)[0] for url in (a.url, b.url, dead_proxy())],
+                         max_failures=2)
+        results = crawl(pool, server)
+    stats = list(pool.stats().values())
+    assert not stats[2]['in_rotation']
+    assert stats[2]['errors'] == stats[2]['requests'] <= 4
+    assert sum(r is not None for r in results) >= 36
+
+def test_slow_endpoint_is_taken_out_of_rotation():
+    pool = ProxyPool([proxy_endpoints(f"socks5h://127.0.0.1:{port}", [], 0)[0]
+                      for port in (9050, 9051, 9052)], slow_factor=3, min_samples=3)
+    for _ in range(30):
+        taken = pool.acquire()
+        pool.release(taken, 1.0 if taken is pool.endpoints[2] else 0.1)
+    stats = list(pool.stats().values())
+    assert [s['in_rotation'] for s in stats] == [True, True, False]
+
+def test_ejected_endpoint_returns_after_timeout():
+    pool = ProxyPool([{'http': 'socks5h://127.0.0.1:9050'}, {'http': 'socks5h://127.0.0.1:9051'}],
+                     max_failures=1, eject_seconds=0)
+    first = pool.endpoints[0]
+    pool.acquire()
+    pool.release(first, 0.1, failed=True)
+    assert pool.peek() in pool.endpoints
+    assert first.failures == 0
+
+def test_last_endpoint_stays_in_rotation():
+    pool = ProxyPool([{'http': 'socks5h://127.0.0.1:9050'}], max_failures=1)
+    endpoint = pool.acquire()
+    pool.release(endpoint, 0.1, failed=True)
+    assert pool.stats()[endpoint.name]['in_rotation']
+    assert pool.all_failing()
+
+def test_concurrent_acquire_balances():
+    pool = ProxyPool([{'http': f'socks5h://127.0.0.1:{9050 + i}'} for i in range(4)])
+    held = []
+    lock = threading.Lock()
+
+    def take():
+        endpoint = pool.acquire()
+        with lock:
+            held.append(endpoint)
+
+    threads = [threading.Thread(target=take) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(s['outstanding'] for s in pool.stats().values()) == [2, 2, 2, 2]
@@ -0,0 +1,45 @@
+import time
+from email.utils import formatdate
+from ratelimit import RateLimiter, parse_retry_after
+
+def test_parse_retry_after():
+    assert parse_retry_after('120') == 120.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+    assert 25 < parse_retry_after(formatdate(time.time() + 30, usegmt=True)) <= 30
+
+def test_token_bucket_paces_requests():
+    limiter = RateLimiter(initial_rate=10, max_rate=10, burst=1)
+    assert limiter.try_acquire('a') == 0
+    wait = limiter.try_acquire('a')
+    assert 0 < wait <= 0.1
+    # Hosts are paced independently
+    assert limiter.try_acquire('b') == 0
+
+def test_additive_increase_multiplicative_decrease():
+    limiter = RateLimiter(initial_rate=1, max_rate=5, increase=0.5, decrease=0.5)
+    for _ in range(4):
+        limiter.record('a', 0.1)
+    assert limiter.stats()['a']['rate'] == 3
+    time.sleep(0.01)
+    limiter.record('a', 0.001, failed=True)
+    assert limiter.stats()['a']['rate'] == 1.5
+
+def test_one_decrease_per_burst_of_failures():
+    limiter = RateLimiter(initial_rate=8, decrease=0.5)
+    limiter.record('a', 0.5, throttled=True)
+    # Sent before the first answer came back: same congestion event
+    limiter.record('a', 0.5, throttled=True)
+    assert limiter.stats()['a']['rate'] == 2
+
+def test_retry_after_pauses_the_host():
+    limiter = RateLimiter(initial_rate=100, burst=10)
+    limiter.record('a', 0.1, throttled=True, retry_after=5)
+    assert 4 < limiter.try_acquire('a') <= 5
+
+def test_backoff_is_jittered_and_bounded():
+    limiter = RateLimiter()
+    delays = [limiter.backoff(10) for _ in range(50)]
+    assert all(0 <= d <= 0.05 for d in delays)
+    assert len(set(delays)) > 1
+    assert limiter.backoff(1, retry_after=3) >= 3
@@ -0,0 +1,121 @@
+import fnmatch
+import hashlib
+import math
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import config
+from config import (
+    VISITED_MODE, VISITED_CAPACITY, VISITED_ERROR_RATE
+)
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+def _dropped(name, drop_params):
+    name = name.lower()
+    return any(fnmatch.fnmatchcase(name, pattern.lower()) for pattern in drop_params)
+
+def canonicalize(url, drop_params=None, strip_trailing_slash=None):
+    """
+    Reduce the variants of one page to a single URL: lower-case scheme and
+    host, no default port, no fragment, sorted query without the params
+    matching `drop_params` (glob patterns such as 'utm_*') and, optionally,
+    no trailing slash outside the root path. Both default to the config
+    in use when called.
+    """
+    if drop_params is None:
+        drop_params = config.CANONICAL_DROP_PARAMS
+    if strip_trailing_slash is None:
+        strip_trailing_slash = config.CANONICAL_STRIP_TRAILING_SLASH
+    try:
+        parts = urlsplit(url.strip())
+        scheme = parts.scheme.lower()
+        host = (parts.hostname or '').lower()
+        port = parts.port
+    except ValueError:
+        return url
+
+    netloc = host
+    if parts.username or parts.password:
+        userinfo = parts.username or ''
+        if parts.password:
+            userinfo += f":{parts.password}"
+        netloc = f"{userinfo}@{host}"
+    if port and port != DEFAULT_PORTS.get(scheme):
+        netloc += f":{port}"
+
+    path = parts.path or '/'
+    if strip_trailing_slash and len(path) > 1:
+        path = path.rstrip('/') or '/'
+
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if not _dropped(k, drop_params)]
+    query.sort()
+
+    return urlunsplit((scheme, netloc, path, urlencode(query), ''))
+
+def fingerprint(url):
+    """64-bit fingerprint of a URL"""
+    return int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'big')
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter sized for `capacity` items at `error_rate`
+    false positives. Uses double hashing over one blake2b digest.
+    """
+
+    def __init__(self, capacity=VISITED_CAPACITY, error_rate=VISITED_ERROR_RATE):
+        capacity = max(1, int(capacity))
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:], 'big') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        new = False
+        for pos in self._positions(item):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                new = True
+        if new:
+            self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[pos // 8] & (1 << (pos % 8)) for pos in self._positions(item))
+
+    def __len__(self):
+        return self.count
+
+class FingerprintSet:
+    """Set of 64-bit URL fingerprints instead of full URL strings"""
+
+    def __init__(self):
+        self._fingerprints = set()
+
+    def add(self, url):
+        self._fingerprints.add(fingerprint(url))
+
+    def __contains__(self, url):
+        return fingerprint(url) in self._fingerprints
+
+    def __len__(self):
+        return len(self._fingerprints)
+
+def make_visited(mode=VISITED_MODE):
+    """
+    Build the visited-URL structure for a crawl.
+    'exact' is a plain set, 'fingerprint' keeps 64-bit hashes and
+    'bloom' a fixed-size Bloom filter with a bounded false-positive rate.
+    """
+    if mode == 'exact':
+        return set()
+    if mode == 'fingerprint':
+        return FingerprintSet()
+    if mode == 'bloom':
+        return BloomFilter()
+    raise ValueError(f"Invalid visited mode: {mode}")